@@ -0,0 +1,100 @@
+import re
+import json
+import hashlib
+from collections import OrderedDict
+
+# Keyword table in priority order: when a title contains keywords of several
+# types, the type listed first wins ("45-Minute Bike Test" is a Test, not a Bike).
+DEFAULT_KEYWORDS = (
+    ("Test", ("Swim Test", "Run Test", "Bike Test")),
+    ("Swim", ("Swim",)),
+    ("Bike", ("Bike", "Ride")),
+    ("Run", ("Run",)),
+)
+DEFAULT_EXACT_TITLES = {"Day Off": "Rest"}
+DEFAULT_ACTIVITY_TYPE = "Unknown"
+DEFAULT_CACHE_SIZE = 4096
+
+class ActivityClassifier:
+    # Maps a workout title to its activityType. The keyword table is compiled
+    # into one regex, and results are kept in a bounded LRU cache because the
+    # same few hundred titles repeat across every plan.
+    def __init__(self, keywords=DEFAULT_KEYWORDS, exact_titles=None,
+                 default=DEFAULT_ACTIVITY_TYPE, maxsize=DEFAULT_CACHE_SIZE):
+        self.exact_titles = dict(DEFAULT_EXACT_TITLES if exact_titles is None else exact_titles)
+        self.default = default
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        # Identifies the classification table (not the cache state)
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [keywords, sorted(self.exact_titles.items()), default]).encode("utf-8")).hexdigest()
+
+        self._types = []
+        self._rank_of_keyword = {}
+        alternatives = []
+        for rank, (activity_type, words) in enumerate(keywords):
+            self._types.append(activity_type)
+            for word in words:
+                self._rank_of_keyword.setdefault(word, rank)
+                alternatives.append(word)
+        # Alternatives are in priority order, and the lookahead lets every
+        # position report its best keyword even where keywords overlap.
+        if alternatives:
+            self._matcher = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))")
+        else:
+            self._matcher = None
+
+    def _classify_uncached(self, title):
+        if title in self.exact_titles:
+            return self.exact_titles[title]
+        if self._matcher is None:
+            return self.default
+        best = None
+        for match in self._matcher.finditer(title):
+            rank = self._rank_of_keyword[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return self.default if best is None else self._types[best]
+
+    def classify(self, title):
+        cache = self._cache
+        if title in cache:
+            self.hits += 1
+            cache.move_to_end(title)
+            return cache[title]
+        self.misses += 1
+        activity_type = self._classify_uncached(title)
+        if self.maxsize > 0:
+            cache[title] = activity_type
+            if len(cache) > self.maxsize:
+                cache.popitem(last=False)
+        return activity_type
+
+    __call__ = classify
+
+    def cache_info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+        }
+
+    def cache_clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+_default_classifier = None
+
+def get_default_classifier():
+    # One shared instance per process, so the cache carries over between plans
+    # (and between files handled by the same batch worker).
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ActivityClassifier()
+    return _default_classifier
@@ -0,0 +1,168 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from parse_plan import iter_training_plan, EXPECTED_ENTRIES
+from activity_classifier import get_default_classifier
+from plan_cache import get_cache
+from plan_validator import get_validator, format_violation
+
+MAX_REPORTED_VIOLATIONS = 20  # Per file in the manifest; violationCount has the full number
+
+def collect_inputs(patterns):
+    # Each pattern is either a directory (all *.txt files inside it) or a glob
+    inputs = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.txt"))
+        else:
+            matches = glob.glob(pattern)
+        inputs.extend(path for path in matches if os.path.isfile(path))
+    return sorted(set(inputs))
+
+def assign_output_paths(inputs, output_dir):
+    # One JSON per input, named after the input file. Inputs from different
+    # directories can share a name, so later ones get a numeric suffix.
+    outputs = {}
+    used = set()
+    for input_path in inputs:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        name = stem
+        suffix = 2
+        while name in used:
+            name = f"{stem}-{suffix}"
+            suffix += 1
+        used.add(name)
+        outputs[input_path] = os.path.join(output_dir, name + ".json")
+    return outputs
+
+def compile_plan_file(input_path, output_path, cache_dir=None):
+    # Runs in a worker process. Never raises: a bad file is reported in the
+    # result so the rest of the batch keeps going.
+    started = time.perf_counter()
+    result = {
+        "input": input_path,
+        "output": None,
+        "entries": 0,
+        "expectedEntries": False,
+        "seconds": 0.0,
+        "error": None,
+        "violationCount": 0,
+        "violations": [],
+        "worker": os.getpid(),
+        "classifierCache": None,
+        "weekCache": None,
+    }
+    cache = None
+    try:
+        if cache_dir is not None:
+            cache = get_cache(cache_dir)
+        with open(input_path, "r", encoding="utf-8") as f:
+            entries = list(iter_training_plan(f, cache=cache))
+        with open(output_path, "w") as f:
+            json.dump(entries, f, indent=4)
+        result["output"] = output_path
+        result["entries"] = len(entries)
+        result["expectedEntries"] = len(entries) == EXPECTED_ENTRIES
+        violations = get_validator("raw").validate(entries)
+        result["violationCount"] = len(violations)
+        result["violations"] = [format_violation(v) for v in violations[:MAX_REPORTED_VIOLATIONS]]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - started, 6)
+    # Cumulative for the worker's shared classifier, not just this file
+    result["classifierCache"] = get_default_classifier().cache_info()
+    if cache is not None:
+        result["weekCache"] = cache.stats()
+    return result
+
+def _compile_job(job):
+    return compile_plan_file(*job)
+
+def _sum_worker_totals(results, field, counters):
+    # Each worker's last snapshot of `field` holds its totals; sum those across workers
+    worker_totals = {}
+    for r in results:
+        info = r[field]
+        if info is None:
+            continue
+        previous = worker_totals.get(r["worker"])
+        if previous is None or sum(info[c] for c in counters) > sum(previous[c] for c in counters):
+            worker_totals[r["worker"]] = info
+    return {c: sum(info[c] for info in worker_totals.values()) for c in counters}
+
+def compile_batch(inputs, output_dir, workers=None, cache_dir=None):
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = assign_output_paths(inputs, output_dir)
+    jobs = [(input_path, outputs[input_path], cache_dir) for input_path in inputs]
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [_compile_job(job) for job in jobs]
+    else:
+        # Plans are small, so hand them out in chunks to keep IPC overhead low
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_compile_job, jobs, chunksize=chunksize))
+    wall_seconds = time.perf_counter() - started
+
+    failures = [r for r in results if r["error"]]
+    unexpected = [r for r in results if not r["error"] and not r["expectedEntries"]]
+    invalid = [r for r in results if r["violationCount"]]
+    return {
+        "inputs": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "unexpectedEntryCount": len(unexpected),
+        "invalid": len(invalid),
+        "expectedEntriesPerPlan": EXPECTED_ENTRIES,
+        "totalEntries": sum(r["entries"] for r in results),
+        "workers": workers,
+        "wallSeconds": round(wall_seconds, 6),
+        "workerSeconds": round(sum(r["seconds"] for r in results), 6),
+        "plansPerSecond": round(len(results) / wall_seconds, 2) if wall_seconds else None,
+        "classifierCache": _sum_worker_totals(results, "classifierCache", ("hits", "misses")),
+        "weekCache": _sum_worker_totals(results, "weekCache", ("hits", "misses", "writes", "evictions"))
+        if cache_dir is not None else None,
+        "files": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a batch of plan text files to JSON in parallel.")
+    parser.add_argument("inputs", nargs="+", help="Directories (*.txt inside) or glob patterns of plan text files")
+    parser.add_argument("-o", "--output-dir", default="compiled_plans", help="Where the per-plan JSON files go")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=None, help="Reuse parsed weeks cached in this directory")
+    parser.add_argument("--manifest", default=None, help="Manifest path (default: <output-dir>/manifest.json)")
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("No plan text files matched.", file=sys.stderr)
+        return 1
+
+    manifest = compile_batch(inputs, args.output_dir, workers=args.workers, cache_dir=args.cache_dir)
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    print(f"Compiled {manifest['succeeded']}/{manifest['inputs']} plans "
+          f"({manifest['totalEntries']} entries) in {manifest['wallSeconds']:.2f}s "
+          f"with {manifest['workers']} workers.")
+    if manifest["unexpectedEntryCount"]:
+        print(f"{manifest['unexpectedEntryCount']} plans did not generate {EXPECTED_ENTRIES} entries.")
+    if manifest["invalid"]:
+        print(f"{manifest['invalid']} plans have violations (see the manifest).")
+    for r in manifest["files"]:
+        if r["error"]:
+            print(f"Failed: {r['input']}: {r['error']}", file=sys.stderr)
+    print(f"Manifest saved to {manifest_path}")
+    return 1 if manifest["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from statistics import mean, median, quantiles
+
+from parse_plan import parse_training_plan
+from process_training_plan import modify_training_plan
+from synthetic_plan import generate_corpus
+from plan_payload import decode_plan, dumps_payload, payload_sizes
+
+DEFAULT_BASELINE_PATH = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.25  # Fail when a metric is more than 25% worse than the baseline
+# Metrics compared against the baseline; lower is better for all of them
+COMPARED_METRICS = ("p50Seconds", "p95Seconds", "peakBytes")
+
+def _percentile(samples, pct):
+    if len(samples) < 2:
+        return samples[0]
+    return quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+def measure(func, entries, repeats):
+    # Times `func` `repeats` times after one warm-up call, then runs it once
+    # more under tracemalloc for the peak memory (tracing slows the timed runs
+    # down too much to do both at once). The collector is paused during timed
+    # runs, as timeit does, so collections triggered by earlier garbage don't
+    # land in random samples.
+    func()
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+            gc.collect()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    p50 = median(samples)
+    return {
+        "entries": entries,
+        "repeats": repeats,
+        "meanSeconds": round(mean(samples), 6),
+        "p50Seconds": round(p50, 6),
+        "p95Seconds": round(_percentile(samples, 95), 6),
+        "entriesPerSecond": round(entries / p50, 1) if p50 else None,
+        "peakBytes": peak,
+    }
+
+def run_benchmarks(weeks=12, athletes=100, seed=0, repeats=10):
+    text = generate_corpus(weeks, athletes, seed)
+    entries = parse_training_plan(text)
+    results = {
+        "parse": measure(lambda: parse_training_plan(text), len(entries), repeats),
+    }
+
+    fd, plan_path = tempfile.mkstemp(suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=4)
+        # modify_training_plan reads the file and serializes its result, as the CLI does
+        modified = len(json.loads(modify_training_plan(plan_path)))
+        results["modify"] = measure(lambda: modify_training_plan(plan_path), modified, repeats)
+    finally:
+        os.remove(plan_path)
+
+    results["serialize"] = measure(lambda: json.dumps(entries, indent=4), len(entries), repeats)
+    # Python stand-ins for what the page does on load: parse the embedded plan
+    # as plain JSON, and decode the compact payload update_page.py now embeds.
+    # The page itself runs decodePlanPayload in the browser, which this doesn't
+    # time; the Py suffix keeps the two from being mistaken for each other
+    pretty = json.dumps(entries, indent=4)
+    payload = dumps_payload(entries)
+    results["loadJsonPy"] = measure(lambda: json.loads(pretty), len(entries), repeats)
+    results["decodePayloadPy"] = measure(lambda: decode_plan(json.loads(payload)), len(entries), repeats)
+    return {
+        "config": {"weeks": weeks, "athletes": athletes, "seed": seed, "repeats": repeats},
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": results,
+        "sizes": payload_sizes(entries),
+    }
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    # Regressions as (benchmark, metric, baseline value, current value)
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if previous.get(metric) and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing, post-processing and serialization.")
+    parser.add_argument("-w", "--weeks", type=int, default=12, help="Weeks per synthetic plan")
+    parser.add_argument("-a", "--athletes", type=int, default=100, help="Plans in the synthetic corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-r", "--repeats", type=int, default=10, help="Timed runs per benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown/growth as a fraction (default: 0.25)")
+    parser.add_argument("-o", "--output", help="Also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+    if args.threshold < 0:
+        parser.error("--threshold must not be negative")
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    results = run_benchmarks(args.weeks, args.athletes, args.seed, args.repeats)
+    for name, r in results["benchmarks"].items():
+        print(f"{name:10} {r['entries']:>8} entries  p50 {r['p50Seconds'] * 1000:9.2f} ms  "
+              f"p95 {r['p95Seconds'] * 1000:9.2f} ms  {r['entriesPerSecond']:>12,.0f} entries/s  "
+              f"peak {r['peakBytes'] / 1024:10.0f} KiB")
+    pretty = results["sizes"]["prettyJson"]["bytes"]
+    for name, size in results["sizes"].items():
+        print(f"{name:12} {size['bytes']:>10} bytes ({size['bytes'] / pretty:6.1%})  "
+              f"gzip {size['gzipBytes']:>9} bytes")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print(f"Baseline was recorded with {baseline.get('config')}, not {results['config']}; not comparing.",
+              file=sys.stderr)
+        return 2
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, previous, current in regressions:
+        print(f"Regression: {name} {metric} {previous} -> {current} "
+              f"(+{(current / previous - 1) * 100:.0f}%, limit {args.threshold * 100:.0f}%)", file=sys.stderr)
+    if regressions:
+        return 1
+    print(f"No regressions past {args.threshold * 100:.0f}% against {args.baseline}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+
+STORAGE_PREFIX = "workout-"  # index.html keeps 'workout-' + ISO date -> 'completed' in localStorage
+COMPLETED = "completed"
+BUSY_TIMEOUT_MS = 10000
+WRITE_RETRIES = 5
+BATCH_SIZE = 5000
+
+# Completions are keyed by (athlete, date), the same key the page uses per
+# browser. Every filtered query below is a range over a primary key or an
+# index, so none of them scan a whole table (stats() is the exception: it
+# counts whole tables for the CLI):
+#   completions  (athlete, date)        per-athlete date ranges
+#   completions_by_date (date, athlete) date ranges across athletes
+#   plan_entries (plan, date, seq)      joining a completion to its workout(s)
+#   plan_entries_by_type (plan, activity_type, date)
+#   plan_entries_by_type_date (activity_type, date, plan)  one type across plans
+#   athletes_by_plan (plan, athlete)    from a plan's workouts to its athletes
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    athlete TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (athlete, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS completions_by_date ON completions (date, athlete);
+CREATE TABLE IF NOT EXISTS athletes (
+    athlete TEXT PRIMARY KEY,
+    plan TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS plan_entries (
+    plan TEXT NOT NULL,
+    date TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    activity_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (plan, date, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS plan_entries_by_type ON plan_entries (plan, activity_type, date);
+CREATE INDEX IF NOT EXISTS plan_entries_by_type_date ON plan_entries (activity_type, date, plan);
+CREATE INDEX IF NOT EXISTS athletes_by_plan ON athletes (plan, athlete);
+"""
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def _chunks(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def parse_local_storage(items):
+    # (date, status) pairs from a localStorage dump ({"workout-2025-06-01":
+    # "completed", "theme": "dark", ...}); keys that aren't workouts are skipped
+    for key, value in items.items():
+        if key.startswith(STORAGE_PREFIX):
+            yield key[len(STORAGE_PREFIX):], value
+
+class CompletionStore:
+    # Workout completions for many athletes in one SQLite file, in WAL mode so
+    # readers never block the writer and writers from other processes queue
+    # on the database lock (up to BUSY_TIMEOUT_MS, then retried) instead of
+    # failing. Use one store per thread or process; connections aren't shared.
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        self.conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")  # Durable across app crashes; WAL makes this safe
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _write(self, work):
+        # Runs work(conn) in one write transaction. BEGIN IMMEDIATE takes the
+        # write lock up front, so a busy database fails here (and is retried)
+        # rather than halfway through the batch.
+        for attempt in range(WRITE_RETRIES):
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = work(self.conn)
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    raise
+                self.conn.execute("COMMIT")
+                return result
+            except sqlite3.OperationalError as e:
+                # A COMMIT that fails busy leaves the transaction open, and the
+                # next BEGIN IMMEDIATE would fail inside it; start over clean
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                if "locked" not in str(e) and "busy" not in str(e) or attempt == WRITE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+
+    # --- Plans ---
+
+    def load_plan(self, plan, entries):
+        # Replaces the stored copy of a parsed plan (training_plan.json entries)
+        def work(conn):
+            conn.execute("DELETE FROM plan_entries WHERE plan = ?", (plan,))
+            rows = []
+            previous, seq = None, 0
+            for entry in entries:
+                seq = seq + 1 if entry["date"] == previous else 0
+                previous = entry["date"]
+                rows.append((plan, entry["date"], seq, entry["week"], entry["activityType"], entry["title"]))
+            conn.executemany("INSERT INTO plan_entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return len(rows)
+        return self._write(work)
+
+    def assign_plan(self, athlete, plan):
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO athletes VALUES (?, ?) ON CONFLICT (athlete) DO UPDATE SET plan = excluded.plan",
+            (athlete, plan)))
+
+    # --- Completions ---
+
+    def upsert(self, rows):
+        # rows: (athlete, date, status) tuples. Sent in transactions of
+        # BATCH_SIZE rows, so a long import doesn't hold the write lock for
+        # its whole run. Returns the number of rows written.
+        written = 0
+        sql = ("INSERT INTO completions VALUES (?, ?, ?, ?) ON CONFLICT (athlete, date) "
+               "DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at")
+        for batch in _chunks(rows):
+            now = _now()
+            self._write(lambda conn: conn.executemany(sql, [(a, d, s, now) for a, d, s in batch]))
+            written += len(batch)
+        return written
+
+    def mark(self, athlete, date, completed=True):
+        # The page's Mark as Complete / Incomplete button
+        if completed:
+            self.upsert([(athlete, date, COMPLETED)])
+        else:
+            self.delete(athlete, [date])
+
+    def delete(self, athlete, dates):
+        deleted = 0
+        for batch in _chunks(dates):
+            cursor = self._write(lambda conn: conn.executemany(
+                "DELETE FROM completions WHERE athlete = ? AND date = ?", [(athlete, d) for d in batch]))
+            deleted += cursor.rowcount
+        return deleted
+
+    def import_local_storage(self, athlete, items, replace=False):
+        # Merges one browser's localStorage dump into the athlete's rows. With
+        # replace, the dump is taken as the whole truth: completions missing
+        # from it (unmarked in that browser) are removed in the same transaction.
+        rows = [(athlete, date, status) for date, status in parse_local_storage(items)]
+        if not replace:
+            return self.upsert(rows)
+        now = _now()
+
+        def work(conn):
+            conn.execute("DELETE FROM completions WHERE athlete = ?", (athlete,))
+            conn.executemany("INSERT INTO completions VALUES (?, ?, ?, ?)", [row + (now,) for row in rows])
+            return len(rows)
+        return self._write(work)
+
+    def export_local_storage(self, athlete):
+        # {"workout-YYYY-MM-DD": "completed", ...}, ready for localStorage.setItem
+        return {STORAGE_PREFIX + date: status for date, status in self.conn.execute(
+            "SELECT date, status FROM completions WHERE athlete = ? ORDER BY date", (athlete,))}
+
+    def query(self, athlete=None, start=None, end=None, activity_type=None):
+        # Completions joined with the athlete's plan: dicts with athlete, date,
+        # status, week, activityType and title (None when the plan has no
+        # workout on that date). Dates are inclusive ISO strings.
+        # A type filter across athletes is driven from the plans' workouts of
+        # that type (CROSS JOIN keeps that order) rather than from completions.
+        by_type = activity_type is not None and athlete is None
+        table = "p" if by_type else "c"
+        where, params = [], []
+        if athlete is not None:
+            where.append("c.athlete = ?")
+            params.append(athlete)
+        if start is not None:
+            where.append(f"{table}.date >= ?")
+            params.append(start)
+        if end is not None:
+            where.append(f"{table}.date <= ?")
+            params.append(end)
+        if activity_type is not None:
+            where.append("p.activity_type = ?")
+            params.append(activity_type)
+        if by_type:
+            source = ("plan_entries p CROSS JOIN athletes a ON a.plan = p.plan "
+                      "CROSS JOIN completions c ON c.athlete = a.athlete AND c.date = p.date")
+        else:
+            join = "JOIN" if activity_type is not None else "LEFT JOIN"
+            source = (f"completions c LEFT JOIN athletes a ON a.athlete = c.athlete "
+                      f"{join} plan_entries p ON p.plan = a.plan AND p.date = c.date")
+        sql = (f"SELECT c.athlete, c.date, c.status, p.week, p.activity_type, p.title FROM {source}"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY c.athlete, c.date, p.seq")
+        return [{"athlete": row[0], "date": row[1], "status": row[2], "week": row[3],
+                 "activityType": row[4], "title": row[5]} for row in self.conn.execute(sql, params)]
+
+    def counts_by_type(self, athlete, start=None, end=None):
+        # {activityType: [completed, planned]} over the athlete's plan
+        bounds, params = "", [athlete]
+        if start is not None:
+            bounds += " AND p.date >= ?"
+            params.append(start)
+        if end is not None:
+            bounds += " AND p.date <= ?"
+            params.append(end)
+        sql = ("SELECT p.activity_type, COUNT(c.date), COUNT(*) FROM athletes a "
+               "JOIN plan_entries p ON p.plan = a.plan "
+               "LEFT JOIN completions c ON c.athlete = a.athlete AND c.date = p.date "
+               f"WHERE a.athlete = ?{bounds} GROUP BY p.activity_type")
+        return {activity_type: [completed, planned] for activity_type, completed, planned
+                in self.conn.execute(sql, params)}
+
+    def stats(self):
+        count = lambda sql: self.conn.execute(sql).fetchone()[0]
+        return {
+            "completions": count("SELECT COUNT(*) FROM completions"),
+            "athletes": count("SELECT COUNT(DISTINCT athlete) FROM completions"),
+            "plans": count("SELECT COUNT(DISTINCT plan) FROM plan_entries"),
+            "journalMode": count("PRAGMA journal_mode"),
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workout completion store (SQLite).")
+    parser.add_argument("db", help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load-plan", help="Store a parsed plan JSON under NAME")
+    load.add_argument("name")
+    load.add_argument("plan", nargs="?", default="training_plan.json")
+    assign = commands.add_parser("assign", help="Put ATHLETE on plan NAME")
+    assign.add_argument("athlete")
+    assign.add_argument("name")
+    imp = commands.add_parser("import", help="Import a localStorage JSON dump for ATHLETE")
+    imp.add_argument("athlete")
+    imp.add_argument("file", help="JSON object of localStorage keys, or - for stdin")
+    imp.add_argument("--replace", action="store_true", help="Drop completions missing from the dump")
+    exp = commands.add_parser("export", help="Print ATHLETE's completions as localStorage JSON")
+    exp.add_argument("athlete")
+    query = commands.add_parser("query", help="List completions joined with the plan")
+    query.add_argument("--athlete")
+    query.add_argument("--from", dest="start", metavar="YYYY-MM-DD")
+    query.add_argument("--to", dest="end", metavar="YYYY-MM-DD")
+    query.add_argument("--type", dest="activity_type", metavar="ACTIVITY")
+    summary = commands.add_parser("summary", help="Completed/planned workouts by type for ATHLETE")
+    summary.add_argument("athlete")
+    commands.add_parser("stats", help="Row counts")
+    args = parser.parse_args(argv)
+
+    with CompletionStore(args.db) as store:
+        if args.command == "load-plan":
+            with open(args.plan, "r") as f:
+                count = store.load_plan(args.name, json.load(f))
+            print(f"Stored {count} entries as plan {args.name}")
+        elif args.command == "assign":
+            store.assign_plan(args.athlete, args.name)
+        elif args.command == "import":
+            if args.file == "-":
+                items = json.load(sys.stdin)
+            else:
+                with open(args.file, "r") as f:
+                    items = json.load(f)
+            count = store.import_local_storage(args.athlete, items, replace=args.replace)
+            print(f"Imported {count} completions for {args.athlete}")
+        elif args.command == "export":
+            print(json.dumps(store.export_local_storage(args.athlete), indent=4))
+        elif args.command == "query":
+            for row in store.query(args.athlete, args.start, args.end, args.activity_type):
+                print(f"{row['athlete']}  {row['date']}  {row['activityType'] or '-':<6} "
+                      f"{row['title'] or '(not in plan)'}  [{row['status']}]")
+        elif args.command == "summary":
+            for activity_type, (completed, planned) in sorted(store.counts_by_type(args.athlete).items()):
+                print(f"{activity_type:<6} {completed:>4}/{planned:<4}")
+        else:
+            print(json.dumps(store.stats(), indent=4))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,236 +1,345 @@
 import re
+import sys
 import json
-from datetime import datetime, timedelta
-
-def parse_training_plan(text):
-    plan = []
-    current_date = datetime(2025, 5, 26)  # Start date: Monday, May 26, 2025
-    day_of_week_map = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    # Remove introductory text
-    text = text.split("12 Week Sprint Training Plan")[1]
-
-    week_sections = re.split(r"Week (\d+)", text)[1:]
-
-    for i in range(0, len(week_sections), 2):
-        week_number = int(week_sections[i])
-        week_content = week_sections[i+1].strip()
-        
-        lines = week_content.split('\n')
-        
-        current_day_activities = []
-        activity_lines = []
-        current_day_name = None
-
-        line_idx = 0
-        while line_idx < len(lines):
-            line = lines[line_idx].strip()
-
-            if line in day_of_week_map: # Found a day marker
-                # Process previous day's activity if any
-                if current_day_name and activity_lines:
-                    title = activity_lines[0]
-                    details = "\n".join(activity_lines[1:]).strip()
-                    
-                    # Handle if "Day Off" is title and details are empty, or details are on the next line
-                    if title == "Day Off" and not details:
-                        # Check if next line is part of details or a new day
-                        if line_idx + 1 < len(lines) and lines[line_idx+1].strip() not in day_of_week_map and lines[line_idx+1].strip() != "":
-                             # This was handled by the general logic, but explicit "Day Off" needs care
-                             pass # details would have been captured if present
-
-                    current_day_activities.append({
-                        "dayOfWeek": current_day_name,
-                        "title_raw": title, # temporary storage for multi-line titles/details
-                        "details_raw": details
-                    })
-                    activity_lines = []
-
-                current_day_name = line
-                activity_lines = [] # Reset for new day
-            elif current_day_name and line: # Collect lines for the current day
-                activity_lines.append(line)
-            
-            line_idx += 1
-
-        # Process the last activity of the week
-        if current_day_name and activity_lines:
-            title = activity_lines[0]
-            details = "\n".join(activity_lines[1:]).strip()
-            current_day_activities.append({
-                "dayOfWeek": current_day_name,
-                "title_raw": title,
-                "details_raw": details
-            })
-
-        # Now, map these to the full structure with dates and activity types
-        day_index_in_week = 0
-        for activity_data in current_day_activities:
-            day_of_week_str = activity_data["dayOfWeek"]
-            
-            # Ensure we align with the actual day of the week for date assignment
-            while day_of_week_map[current_date.weekday()] != day_of_week_str:
-                # This implies a missing day in the text, like a Monday Day Off not explicitly listed initially
-                # Or we need to advance the date if the text skips days (e.g. Monday -> Wednesday)
-                # For this plan, "Day Off" for Monday is usually listed.
-                # If the first day of the week in text isn't Monday, we might have issues.
-                # The prompt implies all days are covered or are "Day Off".
-
-                # Add implicit "Day Off" if the text skips a day
-                # This case should not happen if all Mondays are "Day Off" and listed
-                if day_of_week_map[current_date.weekday()] not in [a['dayOfWeek'] for a in current_day_activities]:
-                     # This logic is tricky; assuming the text provides all necessary entries.
-                     # The problem is that current_date advances per *parsed* entry, not per actual day.
-                     pass
-
-
-            title = activity_data["title_raw"]
-            details = activity_data["details_raw"]
-            
-            # If title is "Day Off" and details are empty, check if subsequent lines were meant as details
-            # This is tricky because the initial split might have already separated them.
-            # The current logic: title is the first line, rest are details.
-            if title == "Day Off" and not details.strip() and day_of_week_str == "Monday":
-                # Week 1 Monday: "Day Off" \n "Take the day off..."
-                # Week 2 Monday: "Day Off" (no further details on separate lines before next day)
-                # Week 4 Monday: "Day Off" \n "Take the day off..."
-                # This should be handled by how activity_lines are joined.
-                # Let's ensure specific "Day Off" detail assignment for Mondays if necessary
-                if week_number in [1, 4] and day_of_week_str == "Monday":
-                    # The details are correctly captured if they follow "Day Off" on subsequent lines.
-                    # If details were "Take the day off..." it's fine.
-                    # If details were empty, and it's W1/W4 Monday, it means the details were not captured.
-                    # This needs careful check of how `activity_lines` are formed.
-                     if not details: # Explicitly set for these weeks if somehow missed
-                        details = "Take the day off, including as much time off your feet as possible.\nSpend some time preparing meals for the week, as well as arranging work\nand family schedules to best allow for succesful completion of assigned\nworkouts."
-
-            activity_type = "Unknown" # Default
-
-            if title == "Day Off":
-                activity_type = "Rest"
-                if not details: # Generic detail if none provided and not a special Monday
-                    details = "Take the day off."
-            elif "Swim Test" in title or "Run Test" in title or "Bike Test" in title:
-                activity_type = "Test"
-            elif "Swim" in title:
-                activity_type = "Swim"
-            elif "Bike" in title or "Ride" in title :
-                activity_type = "Bike"
-            elif "Run" in title:
-                activity_type = "Run"
-            
-            # Specific corrections and activity type overrides
-            if week_number == 3 and day_of_week_str == "Saturday":
-                activity_type = "Brick"
-                title = "60-Min Build Bike + 5-Min Run"
-                # Details: "WU- 12 minutes easy MS- 4 x 9 minutes TP (test pace), with 2 minutes RI (recovery interval). Then run 5 minutes gradually building to TP. CD- 10 minutes easy"
-                # The original details should be fine as they contain both parts.
-            elif week_number == 5 and day_of_week_str == "Wednesday" and title == "45-Minute Easy Bike":
-                details = "Ride easy/ conversational, and use an easy gear with a high cadence."
-                activity_type = "Bike"
-            elif week_number == 7 and day_of_week_str == "Thursday" and title == "50-Minute Build Ride":
-                title = "50-Minute Build Run" # Corrected title
-                activity_type = "Run"
-                # Details: "WU- 10 minutes easy walk/ jog MS- 4 x 6 minutes TP (test pace), with 2 minutes RI (recovery interval). CD- 8 minutes easy walk/ jog" - these are run details
-            elif week_number == 7 and day_of_week_str == "Saturday": # "65-Minute Build Bike ... Then run 8 minutes..."
-                activity_type = "Brick"
-                title = "65-Min Build Bike + 8-Min Run"
-            elif week_number == 8 and day_of_week_str == "Saturday" and title == "30-Minute Easy Run":
-                if not details.strip(): # If details are missing or just whitespace
-                    details = "Run/walk easy (conversational), taking breaks as needed."
-                activity_type = "Run"
-            elif week_number == 10 and day_of_week_str == "Saturday": # "65-Minute Build Bike ... Then run 10 minutes..."
-                activity_type = "Brick"
-                title = "65-Min Build Bike + 10-Min Run"
-            elif week_number == 12 and day_of_week_str == "Saturday": # "20-Minute Pre-Race Workout..."
-                activity_type = "Brick"
-                title = "20-Min Pre-Race Brick"
-                # Details: "Bike 15 minutes progressing to race pace, then run 5 minutes progressing to race pace."
-                # The script should capture this detail correctly from the input.
-            elif week_number == 12 and day_of_week_str == "Sunday" and title == "RACE DAY":
-                activity_type = "Race"
-                # Details: "Arrive early, trust your sprint training plan, have fun!" - script should capture this
-                # If details are empty for Race Day, add the specified one
-                if not details.strip():
-                    details = "Arrive early, trust your sprint training plan, have fun!"
-            
-            # Ensure Monday "Day Off" entries are captured even if just "Day Off" is listed
-            # This is more about ensuring they are added to `plan`
-            # The date advancement logic needs to be solid.
-
-            # Find the expected day index for current_date
-            expected_day_map_idx = current_date.weekday()
-            # Find the index of the parsed day_of_week_str
-            parsed_day_map_idx = day_of_week_map.index(day_of_week_str)
-
-            # Add "Rest" days for any skipped days before the current parsed day
-            while expected_day_map_idx < parsed_day_map_idx:
-                # This means the text skipped a day (e.g. Monday is missing, Tuesday is first)
-                # Add a "Day Off" for the actual day of the week.
-                plan.append({
-                    "week": week_number,
-                    "dayOfWeek": day_of_week_map[expected_day_map_idx],
-                    "date": current_date.strftime("%Y-%m-%d"),
-                    "activityType": "Rest",
-                    "title": "Day Off",
-                    "details": "Take the day off." # Default for implicitly added rest day
-                })
-                current_date += timedelta(days=1)
-                expected_day_map_idx = current_date.weekday()
-
-
-            plan.append({
-                "week": week_number,
-                "dayOfWeek": day_of_week_str,
-                "date": current_date.strftime("%Y-%m-%d"),
-                "activityType": activity_type,
-                "title": title,
-                "details": details.strip() # Ensure details are stripped of leading/trailing whitespace
-            })
-            
-            current_date += timedelta(days=1)
-            day_index_in_week +=1
-
-        # After processing all entries for a week, fill in any remaining days of that week if needed
-        # (e.g. if Sunday was "Day Off" and not explicitly listed)
-        # The current_date reflects the day *after* the last processed entry.
-        # Its weekday() is now for the *next* day.
-        # Example: If Sunday was the last processed day, current_date is now Monday of next week.
-        # If Saturday was last, current_date is Sunday. We need to check if Sunday was processed.
-        
-        # Check if the week ended prematurely (e.g. last entry was Friday)
-        # The loop `for activity_data in current_day_activities:` handles listed days.
-        # This post-loop fill is for days at the *end* of the week that might be missing.
-        # The `current_date.weekday()` is 0 (Monday) if a full week just ended and current_date incremented.
-        # If it's not 0, it means the week didn't end on a Sunday or current_date didn't roll over.
-        
-        # Simplified: Ensure 7 entries per week by advancing date until next Monday
-        # This assumes the input text has entries for each day that is NOT a "Day Off"
-        # And "Day Off" entries are also explicitly listed.
-        # The logic above for `while expected_day_map_idx < parsed_day_map_idx:` should handle intermediate missing days.
-        # This part is to fill trailing "Day Off"s if the week's entries stop early.
-        
-        # If last processed day was not Sunday for this week
-        if current_day_activities: # only if there were activities parsed for the week
-            last_parsed_day_name = current_day_activities[-1]["dayOfWeek"]
-            last_parsed_day_idx = day_of_week_map.index(last_parsed_day_name)
-            
-            while last_parsed_day_idx < 6: # 6 is Sunday's index
-                last_parsed_day_idx += 1
-                # current_date has already been incremented for the *next* day to be processed
-                # So, if last_parsed_day_name was Saturday, current_date is for Sunday.
-                plan.append({
-                    "week": week_number,
-                    "dayOfWeek": day_of_week_map[last_parsed_day_idx],
-                    "date": current_date.strftime("%Y-%m-%d"),
-                    "activityType": "Rest",
-                    "title": "Day Off",
-                    "details": "Take the day off." 
-                })
-                current_date += timedelta(days=1)
-
-
-    return plan
+import hashlib
+from datetime import date, datetime
+from functools import lru_cache, partial
+from itertools import islice
+
+from plan_rules import load_rules
+from activity_classifier import get_default_classifier
+
+PLAN_HEADER = "12 Week Sprint Training Plan"
+PLAN_START_DATE = datetime(2025, 5, 26)  # Start date: Monday, May 26, 2025
+DAY_OF_WEEK_MAP = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {name: idx for idx, name in enumerate(DAY_OF_WEEK_MAP)}
+EXPECTED_ENTRIES = 84  # 12 weeks * 7 days/week
+PARSER_VERSION = 1  # Bump when parsing changes what entries a week produces; it invalidates cached weeks
+
+TOKEN_PLAN = "PLAN"  # The plan header; every header starts a new plan
+TOKEN_WEEK = "WEEK"  # "Week N", value is N
+TOKEN_DAY = "DAY"    # A line holding only a day name, value is its DAY_INDEX
+TOKEN_TEXT = "TEXT"  # Raw text between markers, value is the text
+
+_DAY_NAMES = "|".join(DAY_OF_WEEK_MAP)
+# "Week N" splits anywhere, even mid-line, the way re.split(r"Week (\d+)", text)
+# used to. Both patterns start with a literal, so the regex engine can skip
+# ahead to candidates instead of trying every position.
+_WEEK_MARKER = re.compile(r"Week (\d+)")
+# A day marker is a line holding only a day name
+_DAY_LINE = re.compile(r"\n[^\S\n]*(" + _DAY_NAMES + r")[^\S\n]*(?=\n|\Z)")
+# The same, for a day name at the very start of a piece (after a week marker
+# or at a chunk boundary, both of which start a line)
+_DAY_AT_START = re.compile(r"[^\S\n]*(" + _DAY_NAMES + r")[^\S\n]*(?=\n|\Z)")
+# The content line and following blank line that end a day's activity
+_END_OF_ACTIVITY = re.compile(r"\S[^\n]*\n[^\S\n]*(?:\n|$)")
+_CHUNK_SIZE = 1 << 16
+_DAY_TEXT_CACHE_SIZE = 4096
+_ISO_DATE_CACHE_SIZE = 4096
+
+_day_texts = {}
+
+def date_ordinal(value):
+    # Dates are accepted as "YYYY-MM-DD" strings, date/datetime objects or ordinals
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return date.fromisoformat(value).toordinal()
+    return value.toordinal()
+
+@lru_cache(maxsize=_ISO_DATE_CACHE_SIZE)
+def iso_date(ordinal):
+    # "YYYY-MM-DD" for an ordinal; the same few hundred dates repeat across
+    # weeks and plans, so they are formatted once
+    return date.fromordinal(ordinal).isoformat()
+
+def _split_day_text(text):
+    # (title, details) for the raw text under a day marker, or None if it is
+    # empty. The title is the first non-blank line and the details are the
+    # remaining non-blank lines, each stripped. The same texts repeat across
+    # weeks and plans, so results are memoized.
+    split = _day_texts.get(text)
+    if split is None:
+        lines = list(filter(None, map(str.strip, text.split("\n"))))
+        split = (lines[0], "\n".join(lines[1:])) if lines else ()
+        if len(_day_texts) >= _DAY_TEXT_CACHE_SIZE:
+            _day_texts.clear()
+        _day_texts[text] = split
+    return split or None
+
+def _iter_chunks(stream):
+    # Pieces of the input that always end on a line boundary, so no marker is
+    # ever cut in half
+    if isinstance(stream, str):
+        pos = 0
+        while pos < len(stream):
+            cut = stream.rfind("\n", pos, pos + _CHUNK_SIZE) + 1
+            if cut <= pos:
+                cut = stream.find("\n", pos + _CHUNK_SIZE) + 1 or len(stream)
+            yield stream[pos:cut]
+            pos = cut
+        return
+    read = getattr(stream, "read", None)
+    if read is not None:
+        carry = ""
+        while True:
+            chunk = read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = carry + chunk
+            cut = chunk.rfind("\n") + 1
+            carry = chunk[cut:]
+            if cut:
+                yield chunk[:cut]
+        if carry:
+            yield carry
+    else:
+        lines = iter(stream)
+        while True:
+            batch = list(islice(lines, 1024))
+            if not batch:
+                break
+            yield "".join(line if line.endswith("\n") else line + "\n" for line in batch)
+
+def _add_day_tokens(tokens, text, start, end):
+    # DAY and TEXT tokens for text[start:end], which begins at a line start
+    match = _DAY_AT_START.match(text, start, end)
+    if match is not None:
+        tokens.append((TOKEN_DAY, DAY_INDEX[match.group(1)]))
+        start = match.end()
+    for match in _DAY_LINE.finditer(text, start, end):
+        match_start = match.start()
+        if match_start > start:
+            tokens.append((TOKEN_TEXT, text[start:match_start]))
+        tokens.append((TOKEN_DAY, DAY_INDEX[match.group(1)]))
+        start = match.end()
+    if start < end:
+        tokens.append((TOKEN_TEXT, text[start:end]))
+
+def _iter_token_batches(stream, stats=None):
+    # The scanner proper: one list of tokens per chunk of input, so the parser
+    # pays no per-token generator overhead. Scanning is about 40% of a parse
+    # and building entries most of the rest (see --profile); both are already
+    # down to one regex match or one dict per day, which is why the parser is
+    # about 1.7x the old line loop's speed rather than 10x.
+    add_day_tokens = _add_day_tokens if stats is None else stats.timed("scan_days", _add_day_tokens)
+    for chunk in _iter_chunks(stream):
+        tokens = []
+        for segment_idx, segment in enumerate(chunk.split(PLAN_HEADER)):
+            if segment_idx:
+                tokens.append((TOKEN_PLAN, None))
+            pos = 0
+            for match in _WEEK_MARKER.finditer(segment):
+                add_day_tokens(tokens, segment, pos, match.start())
+                tokens.append((TOKEN_WEEK, int(match.group(1))))
+                pos = match.end()
+            add_day_tokens(tokens, segment, pos, len(segment))
+        yield tokens
+
+def tokenize_plan(stream):
+    # Single pass over the input (a string, file object or iterable of lines),
+    # yielding (kind, value) tokens.
+    for tokens in _iter_token_batches(stream):
+        yield from tokens
+
+def _trim_plan_preamble(pieces):
+    # A new plan header closes the previous plan's last week. Everything after
+    # the first blank line that follows the last day's activity is the next
+    # plan's introduction (title, author, blurb), not part of that day's details.
+    text = "".join(pieces)
+    match = _END_OF_ACTIVITY.search(text)
+    if match is not None:
+        pieces[:] = [text[:match.end()]]
+
+def _iter_week_blocks(token_batches):
+    # Groups batches of tokens into (plan_index, week_number, day_blocks), where day_blocks
+    # is a list of (day_index, text pieces). Only one week is held at a time.
+    # Tokens before the first plan header, and text before a week's first day
+    # marker, are ignored.
+    plan_index = -1
+    week_number = None
+    day_blocks = []
+    pieces = None
+
+    for tokens in token_batches:
+        for kind, value in tokens:
+            if kind == TOKEN_TEXT:
+                if pieces is not None:
+                    pieces.append(value)
+            elif kind == TOKEN_DAY:
+                if week_number is not None:
+                    pieces = []
+                    day_blocks.append((value, pieces))
+            elif kind == TOKEN_WEEK:
+                if plan_index >= 0:
+                    if week_number is not None:
+                        yield plan_index, week_number, day_blocks
+                    week_number = value
+                    day_blocks = []
+                    pieces = None
+            else:
+                if week_number is not None:
+                    if pieces is not None:
+                        _trim_plan_preamble(pieces)
+                    yield plan_index, week_number, day_blocks
+                plan_index += 1
+                week_number = None
+                day_blocks = []
+                pieces = None
+
+    if week_number is not None:
+        yield plan_index, week_number, day_blocks
+
+def _rest_entry(week_number, day_idx, ordinal):
+    return {
+        "week": week_number,
+        "dayOfWeek": DAY_OF_WEEK_MAP[day_idx],
+        "date": iso_date(ordinal),
+        "activityType": "Rest",
+        "title": "Day Off",
+        "details": "Take the day off." # Default for implicitly added rest day
+    }
+
+def _build_week_entries(week_number, day_blocks, ordinal, rules, classify):
+    # Turns one week's day blocks into entries, starting at date `ordinal`.
+    # Returns the entries and the ordinal the next week starts on.
+    week_entries = []
+    last_day_idx = None
+    rules_by_week_day = rules.by_week_day
+
+    for day_idx, pieces in day_blocks:
+        split = _split_day_text(pieces[0] if len(pieces) == 1 else "".join(pieces))
+        if split is None:
+            continue # A day with nothing listed under it is filled in as a Day Off below
+        title, details = split
+        day_of_week_str = DAY_OF_WEEK_MAP[day_idx]
+
+        # Add "Rest" days for any days the text skipped before this one
+        # (ordinal 1 is a Monday, so (ordinal - 1) % 7 is the weekday index)
+        expected_day_idx = (ordinal - 1) % 7
+        while expected_day_idx < day_idx:
+            week_entries.append(_rest_entry(week_number, expected_day_idx, ordinal))
+            ordinal += 1
+            expected_day_idx = (ordinal - 1) % 7
+
+        entry = {
+            "week": week_number,
+            "dayOfWeek": day_of_week_str,
+            "date": iso_date(ordinal),
+            "activityType": classify(title), # "Unknown" if no keyword matches
+            "title": title,
+            "details": details
+        }
+
+        # Specific corrections and activity type overrides, see training_plan_rules.json
+        if (week_number, day_of_week_str) in rules_by_week_day:
+            rule = rules.match(week_number, day_of_week_str, title)
+            if rule is not None:
+                rule.apply(entry)
+                entry["details"] = entry["details"].strip()
+
+        if not entry["details"] and title == "Day Off": # Generic detail if no rule provided one
+            entry["details"] = "Take the day off."
+
+        week_entries.append(entry)
+        ordinal += 1
+        last_day_idx = day_idx
+
+    # Fill in trailing days if the week's entries stop before Sunday
+    if last_day_idx is not None:
+        while last_day_idx < 6:
+            last_day_idx += 1
+            week_entries.append(_rest_entry(week_number, last_day_idx, ordinal))
+            ordinal += 1
+
+    return week_entries, ordinal
+
+def _cache_key_prefix(rules, classifier):
+    return f"{PARSER_VERSION}\0{rules.fingerprint}\0{classifier.fingerprint}"
+
+def _week_cache_key(prefix, week_number, day_blocks, weekday):
+    # Everything a week's entries depend on apart from its start date: the
+    # section's day texts, which weekday it starts on (that decides which days
+    # are filled in as Rest), and the parser, rules and classifier versions
+    # (in `prefix`, see _cache_key_prefix)
+    digest = hashlib.sha256(f"{prefix}\0{week_number}\0{weekday}".encode("utf-8"))
+    for day_idx, pieces in day_blocks:
+        digest.update(f"\0{day_idx}\0".encode("utf-8"))
+        for piece in pieces:
+            digest.update(piece.encode("utf-8"))
+    return digest.hexdigest()
+
+def _cached_week_entries(cache, prefix, week_number, day_blocks, ordinal, rules, classify):
+    # _build_week_entries through a PlanCache (see plan_cache.py). Weeks are
+    # stored without dates as [day index, activityType, title, details] rows,
+    # since a week's entries fall on consecutive days from `ordinal`.
+    key = _week_cache_key(prefix, week_number, day_blocks, (ordinal - 1) % 7)
+    rows = cache.get(key)
+    if rows is None:
+        week_entries, next_ordinal = _build_week_entries(week_number, day_blocks, ordinal, rules, classify)
+        cache.put(key, [[DAY_INDEX[entry["dayOfWeek"]], entry["activityType"], entry["title"], entry["details"]]
+                        for entry in week_entries])
+        return week_entries, next_ordinal
+
+    week_entries = []
+    for day_idx, activity_type, title, details in rows:
+        week_entries.append({
+            "week": week_number,
+            "dayOfWeek": DAY_OF_WEEK_MAP[day_idx],
+            "date": iso_date(ordinal),
+            "activityType": activity_type,
+            "title": title,
+            "details": details
+        })
+        ordinal += 1
+    return week_entries, ordinal
+
+def iter_training_plan(stream, start_date=None, by_week=False, rules=None, classifier=None, cache=None, stats=None):
+    # Streaming parser: `stream` is a file object or any iterable of lines (a plain
+    # string is read as text). Entries are yielded as soon as their week closes, so
+    # memory stays bounded by one week regardless of input size. With by_week=True
+    # each week's list of entries is yielded instead of single entries.
+    # `rules` defaults to the shared RuleSet compiled from training_plan_rules.json
+    # and `classifier` to the process-wide ActivityClassifier. With a PlanCache
+    # as `cache`, only weeks whose text changed since the last run are re-parsed.
+    # With a PipelineStats as `stats`, time is recorded per stage: scan_weeks
+    # (reading and splitting on plan headers and "Week N"), scan_days (day
+    # marker detection), group, classify and build (dates, Rest filling, rules).
+    if start_date is None:
+        start_date = PLAN_START_DATE
+    if rules is None:
+        rules = load_rules()
+    if classifier is None:
+        classifier = get_default_classifier()
+
+    build = _build_week_entries if cache is None else partial(
+        _cached_week_entries, cache, _cache_key_prefix(rules, classifier))
+    classify = classifier.classify
+    token_batches = _iter_token_batches(stream, stats)
+    if stats is None:
+        week_blocks = _iter_week_blocks(token_batches)
+    else:
+        classify = stats.timed("classify", classify)
+        build = stats.timed("build", build, count=lambda result: len(result[0]))
+        week_blocks = stats.timed_iter("group", _iter_week_blocks(stats.timed_iter("scan_weeks", token_batches, len)))
+
+    start_ordinal = start_date.toordinal()
+    current_plan = None
+    ordinal = start_ordinal
+    for plan_index, week_number, day_blocks in week_blocks:
+        if plan_index != current_plan:
+            # Every plan in a concatenated dump starts from the start date again
+            current_plan = plan_index
+            ordinal = start_ordinal
+        week_entries, ordinal = build(week_number, day_blocks, ordinal, rules, classify)
+        if by_week:
+            yield week_entries
+        else:
+            yield from week_entries
+
+def parse_training_plan(text, start_date=None, rules=None, classifier=None, cache=None, stats=None):
+    return list(iter_training_plan(text, start_date=start_date, rules=rules, classifier=classifier,
+                                   cache=cache, stats=stats))
 
 training_plan_text = """
 12 Week Super Simple Sprint Triathlon Training Plan
@@ -675,28 +784,61 @@ Week 12
 """
 
 if __name__ == "__main__":
-    parsed_data = parse_training_plan(training_plan_text)
+    import argparse
+    parser = argparse.ArgumentParser(description="Parse the embedded training plan into training_plan.json.")
+    parser.add_argument("--binary", metavar="PATH", help="Also write the plan in the binary format (see plan_binary.py)")
+    parser.add_argument("--index", metavar="PATH", help="Also write a month-bucketed date index of the plan")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Reuse parsed weeks cached in DIR (see plan_cache.py)")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="PATH",
+                        help="Print time per pipeline stage, or write it as JSON to PATH")
+    args = parser.parse_args()
+
+    stats = None
+    if args.profile:
+        from plan_stats import PipelineStats
+        stats = PipelineStats()
+
+    cache = None
+    if args.cache_dir:
+        from plan_cache import get_cache
+        cache = get_cache(args.cache_dir)
+    parsed_data = parse_training_plan(training_plan_text, cache=cache, stats=stats)
     # Filter out entries with week 0 or other anomalies if any (though current logic shouldn't produce them)
     # Ensure all required days are present. The parser should now handle implicit Day Offs.
     
     # Correct date assignment: The first day (Monday, May 26, 2025) should be handled correctly.
     # The loop for date advancement needs to be robust.
     
-    # Final check for total number of entries: 12 weeks * 7 days/week = 84 entries.
-    # if len(parsed_data) != 84:
-    #    print(f"Warning: Expected 84 entries, but found {len(parsed_data)}")
-    #    # Optionally print week counts to debug
-    #    week_counts = {}
-    #    for entry in parsed_data:
-    #        wk = entry['week']
-    #        week_counts[wk] = week_counts.get(wk, 0) + 1
-    #    print("Entries per week:", {k:v for k,v in sorted(week_counts.items())})
-
+    # Check the parse against the plan's invariants in one pass: allowed types,
+    # 7 contiguous days per week, weekdays matching dates, exactly one Race
+    from plan_validator import validate_plan, format_violation
+    violations = validate_plan(parsed_data, "raw")
 
     with open("training_plan.json", "w") as f:
-        json.dump(parsed_data, f, indent=4)
+        if stats is None:
+            json.dump(parsed_data, f, indent=4)
+        else:
+            with stats.stage("serialize", entries=len(parsed_data)):
+                json.dump(parsed_data, f, indent=4)
     print("Training plan parsed and saved to training_plan.json")
-    if len(parsed_data) == 84:
-        print("Successfully generated 84 entries.")
+    if args.binary:
+        from plan_binary import write_plan_binary
+        write_plan_binary(parsed_data, args.binary)
+        print(f"Binary plan saved to {args.binary}")
+    if args.index:
+        from plan_index import build_date_index, write_date_index
+        write_date_index(build_date_index(parsed_data), args.index)
+        print(f"Date index saved to {args.index}")
+    if cache is not None:
+        print(f"Week cache: {cache.stats()}")
+    if stats is not None:
+        from plan_stats import report_profile
+        report_profile(stats, args.profile, sys.stderr)
+    if violations:
+        print(f"Warning: {len(violations)} plan violations")
+        for violation in violations:
+            print(f"  {format_violation(violation)}")
+    if len(parsed_data) == EXPECTED_ENTRIES:
+        print(f"Successfully generated {EXPECTED_ENTRIES} entries.")
     else:
-        print(f"Generated {len(parsed_data)} entries, expected 84.")
+        print(f"Generated {len(parsed_data)} entries, expected {EXPECTED_ENTRIES}.")
@@ -0,0 +1,251 @@
+import re
+import sys
+import csv
+import json
+import heapq
+import argparse
+from functools import reduce
+from operator import or_
+
+from parse_plan import parse_training_plan, training_plan_text
+from completion_store import COMPLETED
+
+# Phases as the plan describes them, decided per week by its titles; the
+# first pattern any title in the week matches wins, and a week of only easy
+# sessions and days off is a recovery week.
+PHASES = (
+    ("taper", re.compile(r"Taper|Pre-Race|RACE DAY")),
+    ("peak", re.compile(r"\bPeak\b")),
+    ("test", re.compile(r"\bTest\b")),
+    ("build", re.compile(r"\bBuild\b")),
+)
+RECOVER = "recover"
+# Sessions worth reporting when missed: tests, bricks, the race and quality work
+KEY_TYPES = ("Test", "Brick", "Race")
+KEY_TITLES = re.compile(r"\b(?:Build|Peak)\b")
+
+def week_phase(titles):
+    for phase, pattern in PHASES:
+        if any(pattern.search(title) for title in titles):
+            return phase
+    return RECOVER
+
+def _bits(positions):
+    return reduce(or_, (1 << position for position in positions), 0)
+
+class PlanMasks:
+    # The plan as bitmasks over entry positions: bit i stands for plan entry
+    # i. An athlete's completions are one int in the same layout, so the
+    # workouts of a week, sport or phase they completed are `mask & group`,
+    # counted with int.bit_count. Rest days are left out of every group.
+    def __init__(self, plan):
+        self.plan = plan
+        self.dates = [entry["date"] for entry in plan]
+        self.date_bits = {}
+        for position, day in enumerate(self.dates):
+            self.date_bits[day] = self.date_bits.get(day, 0) | 1 << position
+        workouts = [position for position, entry in enumerate(plan) if entry["activityType"] != "Rest"]
+        self.rest = _bits(position for position, entry in enumerate(plan) if entry["activityType"] == "Rest")
+        self.workouts = _bits(workouts)
+
+        self.weeks, self.sports = {}, {}
+        titles_by_week = {}
+        for position in workouts:
+            entry = plan[position]
+            self.weeks[entry["week"]] = self.weeks.get(entry["week"], 0) | 1 << position
+            self.sports[entry["activityType"]] = self.sports.get(entry["activityType"], 0) | 1 << position
+        for entry in plan:
+            titles_by_week.setdefault(entry["week"], []).append(entry["title"])
+        self.week_phase = {week: week_phase(titles) for week, titles in titles_by_week.items()}
+        self.phases = {}
+        for week, bits in self.weeks.items():
+            phase = self.week_phase[week]
+            self.phases[phase] = self.phases.get(phase, 0) | bits
+        self.key = _bits(position for position in workouts
+                         if plan[position]["activityType"] in KEY_TYPES or KEY_TITLES.search(plan[position]["title"]))
+
+    def mask_of_dates(self, dates):
+        get = self.date_bits.get
+        return reduce(or_, (get(day, 0) for day in dates), 0)
+
+    def through(self, as_of):
+        # Bits of the entries dated on or before `as_of` (None: the whole plan)
+        if as_of is None:
+            return (1 << len(self.dates)) - 1
+        return _bits(position for position, day in enumerate(self.dates) if day <= as_of)
+
+def load_completions(path, masks):
+    # {athlete: completion mask} from an export of completion rows:
+    #   CSV with an athlete,date[,status] header, or
+    #   JSONL of {"athlete", "date"[, "status"]} or {"athlete", "dates": [...]}.
+    # Rows with a status other than "completed" are skipped, as are dates
+    # that aren't in the plan.
+    completions = {}
+    date_bits = masks.date_bits
+    with open(path, "r", newline="") as f:
+        first = f.read(1)
+        f.seek(0)
+        if first in "{[":
+            rows = map(json.loads, filter(str.strip, f))
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            athlete = row["athlete"]
+            if "dates" in row:
+                bits = masks.mask_of_dates(row["dates"])
+            elif row.get("status", COMPLETED) in (COMPLETED, None, ""):
+                bits = date_bits.get(row["date"], 0)
+            else:
+                continue
+            completions[athlete] = completions.get(athlete, 0) | bits
+    return completions
+
+def _longest_run(bits):
+    # Length of the longest run of set bits: each step shortens every run by one
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+def _current_run(bits, width):
+    # Set bits ending at bit width - 1, i.e. the streak still going on the last day
+    gaps = ~bits & ((1 << width) - 1)
+    return width - gaps.bit_length()
+
+class Adherence:
+    # Completion rates, streaks and missed key sessions for many athletes at
+    # once. Rates for a group are sum(bit_count(mask & group)) over athletes,
+    # which map() runs in C, so the Python-level work is per group rather
+    # than per athlete x entry.
+    def __init__(self, masks, completions, as_of=None):
+        self.masks = masks
+        self.athletes = list(completions)
+        self.as_of = as_of
+        self.cutoff = masks.through(as_of)
+        self.width = self.cutoff.bit_length()
+        self.completed = [bits & self.cutoff for bits in completions.values()]
+
+    def _group_rates(self, groups):
+        rates = {}
+        athletes = len(self.completed)
+        for name, group in groups.items():
+            group &= self.cutoff
+            scheduled = group.bit_count() * athletes
+            if not scheduled:
+                continue
+            done = sum(map(int.bit_count, map(group.__and__, self.completed)))
+            rates[name] = round(done / scheduled, 4)
+        return rates
+
+    def athlete_rates(self, group):
+        # Each athlete's completion rate for one group mask, in self.athletes order
+        group &= self.cutoff
+        scheduled = group.bit_count()
+        if not scheduled:
+            return [None] * len(self.completed)
+        return [count / scheduled for count in map(int.bit_count, map(group.__and__, self.completed))]
+
+    def streaks(self):
+        # (longest, current) per athlete, in days. Rest days don't break a
+        # streak; any missed workout does.
+        rest = self.masks.rest & self.cutoff
+        width = self.width
+        return [(_longest_run(bits | rest), _current_run(bits | rest, width)) for bits in self.completed]
+
+    def missed_key_sessions(self):
+        # [(date, title, athletes who missed it)] for each key session so far
+        missed = []
+        athletes = len(self.completed)
+        key = self.masks.key & self.cutoff
+        while key:
+            low = key & -key
+            position = low.bit_length() - 1
+            entry = self.masks.plan[position]
+            done = sum(map(int.bit_count, map(low.__and__, self.completed)))
+            missed.append((entry["date"], entry["title"], athletes - done))
+            key ^= low
+        return missed
+
+    def summary(self, worst=10):
+        masks = self.masks
+        streaks = self.streaks()
+        key = masks.key & self.cutoff
+        key_missed = [(key & ~bits).bit_count() for bits in self.completed]
+        athletes = len(self.completed)
+        return {
+            "athletes": athletes,
+            "asOf": self.as_of,
+            "overall": self._group_rates({"all": masks.workouts}).get("all"),
+            "weeks": self._group_rates(masks.weeks),
+            "sports": self._group_rates(masks.sports),
+            "phases": self._group_rates(masks.phases),
+            "weekPhases": masks.week_phase,
+            "streaks": {
+                "longestMax": max((longest for longest, _ in streaks), default=0),
+                "longestMean": round(sum(longest for longest, _ in streaks) / athletes, 2) if athletes else 0,
+                "currentMean": round(sum(current for _, current in streaks) / athletes, 2) if athletes else 0,
+            },
+            "keySessions": {
+                "scheduled": key.bit_count(),
+                "rate": self._group_rates({"key": masks.key}).get("key"),
+                "missed": [{"date": day, "title": title, "missedBy": count}
+                           for day, title, count in self.missed_key_sessions()],
+                "mostMissed": [{"athlete": self.athletes[idx], "missed": key_missed[idx]}
+                               for idx in heapq.nlargest(worst, range(athletes), key=key_missed.__getitem__)
+                               if key_missed[idx]],
+            },
+        }
+
+    def iter_athlete_reports(self):
+        # One dict per athlete with the same breakdowns as summary()
+        masks = self.masks
+        week_rates = {week: self.athlete_rates(group) for week, group in masks.weeks.items()}
+        sport_rates = {sport: self.athlete_rates(group) for sport, group in masks.sports.items()}
+        phase_rates = {phase: self.athlete_rates(group) for phase, group in masks.phases.items()}
+        overall = self.athlete_rates(masks.workouts)
+        key = masks.key & self.cutoff
+        dates = masks.dates
+        for idx, (athlete, bits, (longest, current)) in enumerate(zip(self.athletes, self.completed, self.streaks())):
+            missed = key & ~bits
+            missed_dates = []
+            while missed:
+                low = missed & -missed
+                missed_dates.append(dates[low.bit_length() - 1])
+                missed ^= low
+            yield {
+                "athlete": athlete,
+                "overall": overall[idx],
+                "weeks": {week: rates[idx] for week, rates in week_rates.items() if rates[idx] is not None},
+                "sports": {sport: rates[idx] for sport, rates in sport_rates.items() if rates[idx] is not None},
+                "phases": {phase: rates[idx] for phase, rates in phase_rates.items() if rates[idx] is not None},
+                "longestStreak": longest,
+                "currentStreak": current,
+                "missedKeySessions": missed_dates,
+            }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan adherence across athletes.")
+    parser.add_argument("completions", help="CSV (athlete,date[,status]) or JSONL export of completions")
+    parser.add_argument("--plan", help="Plan JSON (default: the embedded plan, parsed with its test days)")
+    parser.add_argument("--as-of", metavar="YYYY-MM-DD", help="Only count entries up to this date")
+    parser.add_argument("--athletes", metavar="PATH", help="Also write one JSONL report per athlete")
+    args = parser.parse_args(argv)
+
+    if args.plan:
+        with open(args.plan, "r") as f:
+            plan = json.load(f)
+    else:
+        plan = parse_training_plan(training_plan_text)
+    masks = PlanMasks(plan)
+    adherence = Adherence(masks, load_completions(args.completions, masks), as_of=args.as_of)
+    print(json.dumps(adherence.summary(), indent=4))
+    if args.athletes:
+        with open(args.athletes, "w") as f:
+            for report in adherence.iter_athlete_reports():
+                f.write(json.dumps(report))
+                f.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
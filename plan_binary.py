@@ -0,0 +1,161 @@
+import sys
+import json
+import mmap
+import struct
+import argparse
+from bisect import bisect_left, bisect_right
+
+from parse_plan import DAY_OF_WEEK_MAP, DAY_INDEX, date_ordinal, iso_date
+from plan_table import ACTIVITY_TYPES
+
+# Layout (little-endian):
+#   header   magic, version, type count, record count, records offset, heap offset
+#   types    (heap offset, length) per activity type; the record's type code indexes this
+#   records  fixed width, in date order: date ordinal, week, day index, type code,
+#            then (heap offset, length) for title and for details
+#   heap     deduplicated UTF-8 strings
+MAGIC = b"MSTP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+STRING_REF = struct.Struct("<II")
+RECORD = struct.Struct("<iHBBIIII")
+_DATE = struct.Struct("<i")
+_WEEK = struct.Struct("<H")
+
+class _Heap:
+    def __init__(self):
+        self.data = bytearray()
+        self._refs = {}
+
+    def add(self, value):
+        ref = self._refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            ref = self._refs[value] = (len(self.data), len(encoded))
+            self.data += encoded
+        return ref
+
+def encode_plan(entries):
+    heap = _Heap()
+    types = list(ACTIVITY_TYPES)
+    type_codes = {name: code for code, name in enumerate(types)}
+    records = bytearray()
+    previous = None
+    for entry in entries:
+        ordinal = date_ordinal(entry["date"])
+        # Lookups binary-search both columns, so both must be sorted
+        if previous is not None and (ordinal < previous[0] or entry["week"] < previous[1]):
+            raise ValueError(f"Entries must be in date and week order, {entry['date']} is out of place")
+        previous = (ordinal, entry["week"])
+        code = type_codes.get(entry["activityType"])
+        if code is None:
+            code = type_codes[entry["activityType"]] = len(types)
+            types.append(entry["activityType"])
+        records += RECORD.pack(ordinal, entry["week"], DAY_INDEX[entry["dayOfWeek"]], code,
+                               *heap.add(entry["title"]), *heap.add(entry["details"]))
+
+    type_table = b"".join(STRING_REF.pack(*heap.add(name)) for name in types)
+    records_offset = HEADER.size + len(type_table)
+    heap_offset = records_offset + len(records)
+    header = HEADER.pack(MAGIC, VERSION, len(types), len(records) // RECORD.size, records_offset, heap_offset)
+    return b"".join((header, type_table, bytes(records), bytes(heap.data)))
+
+def write_plan_binary(entries, path):
+    with open(path, "wb") as f:
+        f.write(encode_plan(entries))
+
+class PlanFile:
+    # Memory-mapped reader. Only the header and type table are read up front;
+    # lookups by date or week binary-search the record array in place.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, type_count, self._count, self._records, self._heap = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary plan file")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported version {version}")
+        self.activity_types = [
+            self._string(*STRING_REF.unpack_from(self._mmap, HEADER.size + i * STRING_REF.size))
+            for i in range(type_count)
+        ]
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, offset, length):
+        start = self._heap + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def _date_at(self, idx):
+        return _DATE.unpack_from(self._mmap, self._records + idx * RECORD.size)[0]
+
+    def _week_at(self, idx):
+        return _WEEK.unpack_from(self._mmap, self._records + idx * RECORD.size + 4)[0]
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError("plan entry index out of range")
+        ordinal, week, day, code, title_off, title_len, details_off, details_len = \
+            RECORD.unpack_from(self._mmap, self._records + idx * RECORD.size)
+        return {
+            "week": week,
+            "dayOfWeek": DAY_OF_WEEK_MAP[day],
+            "date": iso_date(ordinal),
+            "activityType": self.activity_types[code],
+            "title": self._string(title_off, title_len),
+            "details": self._string(details_off, details_len),
+        }
+
+    def __iter__(self):
+        for idx in range(self._count):
+            yield self[idx]
+
+    def entry_for_date(self, value):
+        # The entry on a date ("YYYY-MM-DD", date or ordinal), or None
+        ordinal = date_ordinal(value)
+        idx = bisect_left(range(self._count), ordinal, key=self._date_at)
+        if idx < self._count and self._date_at(idx) == ordinal:
+            return self[idx]
+        return None
+
+    def entries_for_week(self, week):
+        lo = bisect_left(range(self._count), week, key=self._week_at)
+        hi = bisect_right(range(self._count), week, key=self._week_at)
+        return [self[idx] for idx in range(lo, hi)]
+
+def read_plan_binary(path):
+    with PlanFile(path) as plan:
+        return list(plan)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert plans between JSON and the binary format.")
+    parser.add_argument("direction", choices=["to-binary", "to-json"])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args(argv)
+
+    if args.direction == "to-binary":
+        with open(args.input, "r") as f:
+            entries = json.load(f)
+        write_plan_binary(entries, args.output)
+    else:
+        entries = read_plan_binary(args.input)
+        with open(args.output, "w") as f:
+            json.dump(entries, f, indent=4)
+    print(f"Converted {len(entries)} entries to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
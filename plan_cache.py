@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import argparse
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 << 20  # 64 MiB on disk
+DEFAULT_MEMORY_WEEKS = 1024
+EVICT_TO = 0.8  # Eviction frees space down to this fraction of max_bytes
+_SUFFIX = ".week.json"
+
+class PlanCache:
+    # Persistent cache of parsed weeks, one small JSON file per week under
+    # `directory`, fronted by an in-memory LRU. Keys are content hashes built
+    # by parse_plan (week text, parser version, rules, classifier, weekday), so
+    # entries never go stale; they only become unused. Files are touched on
+    # every hit and the least recently used ones are evicted once the
+    # directory grows past max_bytes. Writes are atomic, so several processes
+    # can share one directory.
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, memory_weeks=DEFAULT_MEMORY_WEEKS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_weeks = memory_weeks
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self._memory = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(size for _, _, size in self._scan())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _scan(self):
+        # (mtime, path, size) for every cached week on disk
+        files = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(_SUFFIX):
+                    try:
+                        st = item.stat()
+                    except OSError:
+                        continue  # Evicted by another process meanwhile
+                    files.append((st.st_mtime, item.path, st.st_size))
+        return files
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_weeks:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return value
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError):
+            # Unreadable or truncated by a crash; drop it and re-parse
+            self.errors += 1
+            self.misses += 1
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        self.hits += 1
+        self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        path = self._path(key)
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            replaced = os.path.getsize(path)  # Overwriting a key frees the old file's bytes
+        except OSError:
+            replaced = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self.errors += 1
+            self._remove(tmp_path)
+            return
+        self.writes += 1
+        self._bytes += len(data) - replaced
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def evict(self, max_bytes=None):
+        # Removes least recently used weeks until the directory is below
+        # EVICT_TO of the limit. Sizes are re-read from disk, since other
+        # processes may be writing to the same directory.
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        files = sorted(self._scan())
+        total = sum(size for _, _, size in files)
+        if total > limit:
+            target = limit * EVICT_TO
+            for _, path, size in files:
+                if total <= target:
+                    break
+                if self._remove(path):
+                    total -= size
+                    self.evictions += 1
+        self._bytes = total
+        return total
+
+    def clear(self):
+        self._memory.clear()
+        for _, path, _ in self._scan():
+            self._remove(path)
+        self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "bytes": self._bytes,
+            "maxBytes": self.max_bytes,
+            "memoryWeeks": len(self._memory),
+        }
+
+_caches = {}
+
+def get_cache(directory, max_bytes=DEFAULT_MAX_BYTES):
+    # One PlanCache per directory and process, so the in-memory layer and the
+    # statistics carry over between plans (and between files in a batch worker)
+    cache = _caches.get(directory)
+    if cache is None:
+        cache = _caches[directory] = PlanCache(directory, max_bytes)
+    return cache
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or trim a parsed-week cache directory.")
+    parser.add_argument("directory")
+    parser.add_argument("action", choices=["stats", "prune", "clear"])
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Size limit for prune")
+    args = parser.parse_args(argv)
+
+    cache = PlanCache(args.directory, args.max_bytes)
+    if args.action == "prune":
+        cache.evict()
+    elif args.action == "clear":
+        cache.clear()
+    files = cache._scan()
+    print(f"{len(files)} cached weeks, {sum(size for _, _, size in files)} bytes in {args.directory}"
+          + (f" ({cache.evictions} evicted)" if cache.evictions else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import sys
+import json
+import hashlib
+import argparse
+
+DELTA_VERSION = 1
+
+def plan_digest(plan):
+    # sha256 of the plan as training_plan.json stores it, so a client can
+    # check the file it holds against a delta's base before applying it
+    return hashlib.sha256(json.dumps(plan, indent=4).encode("utf-8")).hexdigest()
+
+def _by_date(plan):
+    # Plans come out of the parser in date order; only sort when they don't
+    if any(plan[idx]["date"] > plan[idx + 1]["date"] for idx in range(len(plan) - 1)):
+        return sorted(plan, key=lambda entry: entry["date"])
+    return plan
+
+def _keyed(plan):
+    # (date, n) for the nth entry on a date, so a day with two workouts
+    # pairs them up in order instead of colliding
+    previous, occurrence = None, 0
+    for entry in plan:
+        day = entry["date"]
+        occurrence = occurrence + 1 if day == previous else 0
+        previous = day
+        yield (day, occurrence), entry
+
+def _changed_fields(old, new):
+    # {field: [old, new]} for fields whose value differs, or None when the
+    # entries don't have the same fields (shipped as a remove and an add)
+    if old.keys() != new.keys():
+        return None
+    return {field: [old[field], value] for field, value in new.items() if old[field] != value}
+
+def diff_plans(old, new):
+    # Entries added, removed and changed between two versions of a plan,
+    # matched by date. Both plans are walked once in date order, like a
+    # merge, so this is linear in their length.
+    #   {"added": [entry, ...], "removed": [entry, ...],
+    #    "changed": [{"date": ..., "occurrence": n, "fields": {field: [old, new]}}, ...]}
+    added, removed, changed = [], [], []
+    old_items = list(_keyed(_by_date(old)))
+    new_items = list(_keyed(_by_date(new)))
+    i = j = 0
+    while i < len(old_items) and j < len(new_items):
+        old_key, old_entry = old_items[i]
+        new_key, new_entry = new_items[j]
+        if old_key < new_key:
+            removed.append(old_entry)
+            i += 1
+        elif new_key < old_key:
+            added.append(new_entry)
+            j += 1
+        else:
+            fields = _changed_fields(old_entry, new_entry)
+            if fields is None:
+                removed.append(old_entry)
+                added.append(new_entry)
+            elif fields:
+                changed.append({"date": new_key[0], "occurrence": new_key[1], "fields": fields})
+            i += 1
+            j += 1
+    removed.extend(entry for _, entry in old_items[i:])
+    added.extend(entry for _, entry in new_items[j:])
+    return {"added": added, "removed": removed, "changed": changed}
+
+def make_delta(old, new, diff=None):
+    # The diff in the compact form that is shipped: removals are dates,
+    # changes carry only the new values, and the plans' digests let
+    # apply_delta refuse a delta meant for another version.
+    #   {"version": 1, "base": ..., "target": ...,
+    #    "removed": ["2025-06-01", ...], "added": [entry, ...],
+    #    "changed": [["2025-06-02", {"title": ...}], ...]}
+    # A day's second entry is written as "2025-06-02#1".
+    if diff is None:
+        diff = diff_plans(old, new)
+
+    def key(day, occurrence):
+        return day if occurrence == 0 else f"{day}#{occurrence}"
+
+    # Removed entries are named by their (date, n) in the old plan
+    old_keys = {id(entry): entry_key for entry_key, entry in _keyed(_by_date(old))}
+    removed = [key(*old_keys[id(entry)]) for entry in diff["removed"]]
+    return {
+        "version": DELTA_VERSION,
+        "base": plan_digest(old),
+        "target": plan_digest(_by_date(new)),
+        "removed": removed,
+        "added": diff["added"],
+        "changed": [[key(change["date"], change["occurrence"]),
+                     {field: values[1] for field, values in change["fields"].items()}]
+                    for change in diff["changed"]],
+    }
+
+def _parse_key(key):
+    day, _, occurrence = key.partition("#")
+    return day, int(occurrence or 0)
+
+def apply_delta(plan, delta, verify=True):
+    # A new plan list with the delta applied; `plan` is left as it is.
+    # Walks the plan and the added entries together in date order, so this
+    # is linear too. With verify, the plan must be the delta's base and the
+    # result its target, or ValueError is raised.
+    if delta.get("version") != DELTA_VERSION:
+        raise ValueError(f"Unsupported delta version {delta.get('version')!r}")
+    if verify and plan_digest(plan) != delta["base"]:
+        raise ValueError("Plan does not match the delta's base version")
+
+    removed = set(map(_parse_key, delta["removed"]))
+    changed = {_parse_key(key): fields for key, fields in delta["changed"]}
+    kept = []
+    for key, entry in _keyed(_by_date(plan)):
+        if key in removed:
+            removed.discard(key)
+            continue
+        fields = changed.pop(key, None)
+        if fields:
+            entry = dict(entry)
+            entry.update(fields)
+        kept.append((key, entry))
+    if removed or changed:
+        missing = sorted(f"{day}#{n}" if n else day for day, n in removed | changed.keys())
+        raise ValueError(f"Delta refers to entries not in the plan: {', '.join(missing[:5])}")
+
+    # Kept entries keep their (date, n) in the new plan, and added entries
+    # fill the occurrences left free on their date, in order
+    added = _by_date(delta["added"])
+    result = []
+    i = j = 0
+    while i < len(kept) or j < len(added):
+        if j == len(added) or (i < len(kept) and kept[i][0][0] <= added[j]["date"]):
+            day = kept[i][0][0]
+        else:
+            day = added[j]["date"]
+        occurrence = 0
+        while True:
+            if i < len(kept) and kept[i][0] == (day, occurrence):
+                result.append(kept[i][1])
+                i += 1
+            elif j < len(added) and added[j]["date"] == day:
+                result.append(added[j])
+                j += 1
+            else:
+                break
+            occurrence += 1
+        if not occurrence:
+            # A kept entry's earlier occurrences on its date were removed and
+            # nothing was added in their place. Only a delta made against
+            # another plan does this; without the check the walk never advances.
+            raise ValueError(f"Delta leaves a gap before {day}#{kept[i][0][1]}; "
+                             f"it was not made against this plan")
+
+    if verify and plan_digest(result) != delta["target"]:
+        raise ValueError("Applying the delta did not produce its target version")
+    return result
+
+def write_delta(delta, path):
+    with open(path, "w") as f:
+        json.dump(delta, f, separators=(",", ":"))
+
+def load_delta(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _load_plan(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff plan versions and apply deltas.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    diff_parser = commands.add_parser("diff", help="Write the delta from OLD to NEW")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("-o", "--output", default="-", help="Delta file, or - for stdout")
+    diff_parser.add_argument("--show", action="store_true", help="Print the per-field changes instead")
+    apply_parser = commands.add_parser("apply", help="Apply DELTA to PLAN")
+    apply_parser.add_argument("plan")
+    apply_parser.add_argument("delta")
+    apply_parser.add_argument("-o", "--output", default="-", help="Patched plan file, or - for stdout")
+    apply_parser.add_argument("--no-verify", action="store_true", help="Skip the base and target digest checks")
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        old, new = _load_plan(args.old), _load_plan(args.new)
+        diff = diff_plans(old, new)
+        if args.show:
+            print(json.dumps(diff, indent=4))
+            return 0
+        delta = make_delta(old, new, diff)
+        if args.output == "-":
+            print(json.dumps(delta, separators=(",", ":")))
+        else:
+            write_delta(delta, args.output)
+            size = len(json.dumps(delta, separators=(",", ":")))
+            print(f"{len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed "
+                  f"({size} bytes) -> {args.output}", file=sys.stderr)
+        return 0
+
+    try:
+        plan = apply_delta(_load_plan(args.plan), load_delta(args.delta), verify=not args.no_verify)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.output == "-":
+        print(json.dumps(plan, indent=4))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(plan, f, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import json
+
+def add_to_date_index(index, entry, position):
+    # Buckets are keyed by month ("YYYY-MM") and map each ISO date to the
+    # entry's position in the plan array. The first entry for a date wins.
+    day = entry["date"]
+    index.setdefault(day[:7], {}).setdefault(day, position)
+
+def build_date_index(entries):
+    # {"2025-05": {"2025-05-26": 0, ...}, ...}: the page finds a day's entry
+    # with two lookups instead of scanning the whole plan for every cell
+    index = {}
+    for position, entry in enumerate(entries):
+        add_to_date_index(index, entry, position)
+    return index
+
+def indexed_entries(entries, index):
+    # Passes entries through unchanged while filling `index`, so streaming
+    # writers can emit the index without holding the plan in memory
+    for position, entry in enumerate(entries):
+        add_to_date_index(index, entry, position)
+        yield entry
+
+def write_date_index(index, path):
+    with open(path, "w") as f:
+        json.dump(index, f, indent=4)
@@ -0,0 +1,108 @@
+import sys
+import gzip
+import json
+import argparse
+from collections import Counter
+
+from parse_plan import DAY_OF_WEEK_MAP, date_ordinal, iso_date
+
+PAYLOAD_VERSION = 1
+_COMPACT = (",", ":")
+
+def encode_plan(plan):
+    # The plan as the page embeds it: one column per field, strings stored
+    # once in a table (most used first, so the common ones get the shortest
+    # indexes), activity types as codes and dates as days from the first
+    # entry's date. dayOfWeek follows from the date and isn't stored.
+    #   {"version": 1, "start": "2025-05-26", "types": ["Rest", ...],
+    #    "strings": [...], "day": [0, 2, ...], "week": [1, 1, ...],
+    #    "type": [0, 1, ...], "title": [3, 7, ...], "details": [4, 8, ...]}
+    ordinals = [date_ordinal(entry["date"]) for entry in plan]
+    start = min(ordinals) if ordinals else None
+    for ordinal, entry in zip(ordinals, plan):
+        if DAY_OF_WEEK_MAP[(ordinal - 1) % 7] != entry["dayOfWeek"]:
+            raise ValueError(f"{entry['date']} is not a {entry['dayOfWeek']}; the payload derives weekdays from dates")
+
+    types = [activity_type for activity_type, _ in
+             Counter(entry["activityType"] for entry in plan).most_common()]
+    counts = Counter(entry["title"] for entry in plan)
+    counts.update(entry["details"] for entry in plan)
+    strings = [string for string, _ in counts.most_common()]
+    type_code = {activity_type: code for code, activity_type in enumerate(types)}
+    string_code = {string: code for code, string in enumerate(strings)}
+    return {
+        "version": PAYLOAD_VERSION,
+        "start": iso_date(start) if start is not None else None,
+        "types": types,
+        "strings": strings,
+        "day": [ordinal - start for ordinal in ordinals],
+        "week": [entry["week"] for entry in plan],
+        "type": [type_code[entry["activityType"]] for entry in plan],
+        "title": [string_code[entry["title"]] for entry in plan],
+        "details": [string_code[entry["details"]] for entry in plan],
+    }
+
+def decode_plan(payload):
+    # Back to training_plan.json's entries, field order included
+    if payload.get("version") != PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported plan payload version {payload.get('version')!r}")
+    if not payload["day"]:
+        return []
+    start = date_ordinal(payload["start"])
+    types, strings = payload["types"], payload["strings"]
+    return [
+        {
+            "week": week,
+            "dayOfWeek": DAY_OF_WEEK_MAP[(start + day - 1) % 7],
+            "date": iso_date(start + day),
+            "activityType": types[type_code],
+            "title": strings[title],
+            "details": strings[details],
+        }
+        for day, week, type_code, title, details in zip(
+            payload["day"], payload["week"], payload["type"], payload["title"], payload["details"])
+    ]
+
+def dumps_payload(plan):
+    return json.dumps(encode_plan(plan), separators=_COMPACT)
+
+def payload_sizes(plan):
+    # Bytes of the plan as the page used to embed it and as a payload, raw
+    # and gzipped (what a server would send)
+    formats = {
+        "prettyJson": json.dumps(plan, indent=4),
+        "compactJson": json.dumps(plan, separators=_COMPACT),
+        "payload": dumps_payload(plan),
+    }
+    sizes = {}
+    for name, text in formats.items():
+        data = text.encode("utf-8")
+        sizes[name] = {"bytes": len(data), "gzipBytes": len(gzip.compress(data, mtime=0))}
+    return sizes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode a plan as the page's compact payload.")
+    parser.add_argument("plan", nargs="?", default="training_plan.json", help="Plan JSON")
+    parser.add_argument("-o", "--output", default="-", help="Payload file, or - for stdout")
+    parser.add_argument("--sizes", action="store_true", help="Print payload sizes against plain JSON instead")
+    args = parser.parse_args(argv)
+
+    with open(args.plan, "r") as f:
+        plan = json.load(f)
+    if args.sizes:
+        sizes = payload_sizes(plan)
+        pretty = sizes["prettyJson"]["bytes"]
+        for name, size in sizes.items():
+            print(f"{name:12} {size['bytes']:>10} bytes ({size['bytes'] / pretty:6.1%})  "
+                  f"gzip {size['gzipBytes']:>9} bytes")
+        return 0
+    payload = dumps_payload(plan)
+    if args.output == "-":
+        print(payload)
+    else:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
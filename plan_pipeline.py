@@ -0,0 +1,179 @@
+import os
+import sys
+import argparse
+import tempfile
+import importlib
+from datetime import datetime
+
+from parse_plan import iter_training_plan, training_plan_text
+from plan_rules import load_rules
+from process_training_plan import (VALID_ACTIVITY_TYPES, drop_test_entry, apply_date_override,
+                                   check_activity_type, write_entries)
+from plan_index import indexed_entries, write_date_index
+
+# Stages are functions stage(entry, rules) returning the entry (changed in
+# place or replaced) or None to drop it, the same contract as modify_entry.
+STAGES = {}
+
+def register_stage(name, stage=None):
+    # register_stage("name", func), or as a decorator: @register_stage("name")
+    def register(func):
+        if name in STAGES and STAGES[name] is not func:
+            raise ValueError(f"A stage named {name!r} is already registered")
+        STAGES[name] = func
+        return func
+    return register if stage is None else register(stage)
+
+def require_valid_type(entry, rules):
+    if entry.get("activityType") not in VALID_ACTIVITY_TYPES:
+        raise ValueError(f"{entry.get('date')}: invalid activityType {entry.get('activityType')!r}")
+    return entry
+
+register_stage("drop-tests", drop_test_entry)
+register_stage("date-overrides", apply_date_override)
+register_stage("validate", check_activity_type)
+register_stage("strict-types", require_valid_type)
+
+# What process_training_plan.py's modify_entry does, in the same order
+DEFAULT_STAGES = ("drop-tests", "date-overrides", "validate")
+
+def resolve_stage(stage):
+    if callable(stage):
+        return stage
+    try:
+        return STAGES[stage]
+    except KeyError:
+        raise ValueError(f"Unknown stage {stage!r}; registered: {', '.join(sorted(STAGES))}") from None
+
+class PlanPipeline:
+    # Parse, transform and write in one pass with no intermediate file: each
+    # entry goes through every stage as soon as the parser yields it, and is
+    # written before the next one is built.
+    def __init__(self, stages=DEFAULT_STAGES, rules=None, classifier=None, cache=None, stats=None):
+        self.stage_names = [stage if isinstance(stage, str) else getattr(stage, "__name__", repr(stage))
+                            for stage in stages]
+        self.stages = [resolve_stage(stage) for stage in stages]
+        self.rules = rules if rules is not None else load_rules()
+        self.classifier = classifier
+        self.cache = cache
+        self.stats = stats
+
+    def transform(self, entries):
+        stages = self.stages
+        if self.stats is not None:
+            stages = [self.stats.timed(name, stage, count=lambda entry: 1)
+                      for name, stage in zip(self.stage_names, stages)]
+        rules = self.rules
+        for entry in entries:
+            for stage in stages:
+                entry = stage(entry, rules)
+                if entry is None:
+                    break
+            else:
+                yield entry
+
+    def run(self, stream, start_date=None):
+        # Lazily yields finished entries for plan text (a string, file object
+        # or iterable of lines)
+        entries = iter_training_plan(stream, start_date=start_date, rules=self.rules, classifier=self.classifier,
+                                     cache=self.cache, stats=self.stats)
+        return self.transform(entries)
+
+    def compile(self, stream, start_date=None):
+        return list(self.run(stream, start_date))
+
+    def write(self, stream, out, output_format="json", start_date=None, date_index=None):
+        # Returns the number of entries written. Fills `date_index` (see
+        # plan_index.py) on the way if one is passed.
+        entries = self.run(stream, start_date)
+        if date_index is not None:
+            entries = indexed_entries(entries, date_index)
+        if self.stats is None:
+            return write_entries(entries, out, output_format)
+        with self.stats.stage("write") as stage:
+            stage.entries = write_entries(entries, out, output_format)
+        return stage.entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse and post-process a training plan in one pass.")
+    parser.add_argument("input", nargs="?", help="Plan text file, or - for stdin (default: the embedded plan)")
+    parser.add_argument("-o", "--output", default="training_plan.json", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json")
+    parser.add_argument("--start-date", help="First day of the plan, YYYY-MM-DD (default: 2025-05-26)")
+    parser.add_argument("--stage", action="append", dest="stages", metavar="NAME",
+                        help=f"Transform stage, repeatable, in order (default: {' '.join(DEFAULT_STAGES)})")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                        help="Import MODULE first so the stages it registers can be used")
+    parser.add_argument("--list-stages", action="store_true", help="List registered stages and exit")
+    parser.add_argument("--index", metavar="PATH", help="Also write a month-bucketed date index of the output")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Reuse parsed weeks cached in DIR (see plan_cache.py)")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="PATH",
+                        help="Print time per stage to stderr, or write it as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    for module in args.plugin:
+        importlib.import_module(module)
+    if args.list_stages:
+        for name in sorted(STAGES):
+            print(name)
+        return 0
+
+    stats = None
+    if args.profile:
+        from plan_stats import PipelineStats
+        stats = PipelineStats()
+    cache = None
+    if args.cache_dir:
+        from plan_cache import get_cache
+        cache = get_cache(args.cache_dir)
+    try:
+        pipeline = PlanPipeline(args.stages or DEFAULT_STAGES, cache=cache, stats=stats)
+    except ValueError as e:
+        parser.error(str(e))
+    start_date = datetime.fromisoformat(args.start_date) if args.start_date else None
+
+    if args.input is None:
+        source = training_plan_text
+    elif args.input == "-":
+        source = sys.stdin
+    else:
+        source = open(args.input, "r", encoding="utf-8")
+    # A file output is written next to its destination and renamed into place
+    # once complete, so a stage that raises part-way leaves the old file alone
+    tmp_path = None
+    if args.output == "-":
+        out = sys.stdout
+    else:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(args.output)),
+                                        prefix=".tmp-", suffix=os.path.basename(args.output))
+        out = os.fdopen(fd, "w")
+    date_index = {} if args.index else None
+    try:
+        count = pipeline.write(source, out, args.format, start_date, date_index)
+        if out is sys.stdout and args.format == "json":
+            out.write("\n")
+        if tmp_path is not None:
+            out.close()
+            os.replace(tmp_path, args.output)
+            tmp_path = None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if hasattr(source, "close") and source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    if args.index:
+        write_date_index(date_index, args.index)
+    if stats is not None:
+        from plan_stats import report_profile
+        report_profile(stats, args.profile, sys.stderr)
+    if out is not sys.stdout:
+        print(f"Wrote {count} entries to {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
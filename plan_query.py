@@ -0,0 +1,172 @@
+import sys
+import json
+import argparse
+from bisect import bisect_left, bisect_right
+
+from render_calendar import RACES_PATH, load_races
+
+# The page's legend filters and the activity types each one shows. Cells are
+# classed by activityType (render_calendar.py), and "brick" also covers the
+# older "cross" class. "race-day" shows Race cells; the page's old class
+# check looked for a "race-day" class that no cell has and matched nothing.
+FILTER_TYPES = {
+    "run": ("Run",),
+    "swim": ("Swim",),
+    "bike": ("Bike",),
+    "brick": ("Brick", "Cross"),
+    "rest": ("Rest",),
+    "race-day": ("Race",),
+}
+
+class PlanQuery:
+    # Secondary indexes over a parsed plan: a bitmap per activityType and per
+    # week (bit i stands for entry i) and the dates in sorted order. A query
+    # combines bitmaps with &, | and ~ instead of scanning the entries, and
+    # select() turns the result back into entries.
+    #   q = PlanQuery(entries)
+    #   q.select(q.type("Bike", "Brick") & q.weeks(5, 8) & q.dates(after="2025-07-01"))
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.all = (1 << len(self.entries)) - 1
+        self.by_type = {}
+        self.by_week = {}
+        for position, entry in enumerate(self.entries):
+            bit = 1 << position
+            self.by_type[entry["activityType"]] = self.by_type.get(entry["activityType"], 0) | bit
+            week = entry.get("week")
+            if week is not None:
+                self.by_week[week] = self.by_week.get(week, 0) | bit
+        order = sorted(range(len(self.entries)), key=lambda position: self.entries[position]["date"])
+        self.sorted_dates = [self.entries[position]["date"] for position in order]
+        # Parsed plans are already in date order, which makes a date range one
+        # contiguous run of bits
+        self._order = None if order == list(range(len(order))) else order
+
+    def type(self, *activity_types):
+        get = self.by_type.get
+        mask = 0
+        for activity_type in activity_types:
+            mask |= get(activity_type, 0)
+        return mask
+
+    def weeks(self, first, last=None):
+        # Weeks first..last inclusive (just `first` without a last)
+        get = self.by_week.get
+        mask = 0
+        for week in range(first, (first if last is None else last) + 1):
+            mask |= get(week, 0)
+        return mask
+
+    def dates(self, start=None, end=None, after=None, before=None):
+        # start/end are inclusive, after/before exclusive; ISO date strings
+        dates = self.sorted_dates
+        low, high = 0, len(dates)
+        if start is not None:
+            low = max(low, bisect_left(dates, start))
+        if after is not None:
+            low = max(low, bisect_right(dates, after))
+        if end is not None:
+            high = min(high, bisect_right(dates, end))
+        if before is not None:
+            high = min(high, bisect_left(dates, before))
+        if low >= high:
+            return 0
+        if self._order is None:
+            return ((1 << high) - 1) ^ ((1 << low) - 1)
+        mask = 0
+        for position in self._order[low:high]:
+            mask |= 1 << position
+        return mask
+
+    def positions(self, mask):
+        # Set bits in ascending order; bin() does the bit walking in C
+        bits = bin(mask & self.all)[:1:-1]
+        positions = []
+        position = bits.find("1")
+        while position >= 0:
+            positions.append(position)
+            position = bits.find("1", position + 1)
+        return positions
+
+    def select(self, mask):
+        entries = self.entries
+        return [entries[position] for position in self.positions(mask)]
+
+    def count(self, mask):
+        return (mask & self.all).bit_count()
+
+    def query(self, text):
+        # Terms are ANDed; commas OR values within a term; a leading "-"
+        # negates a term.
+        #   "type:Bike,Brick week:5-8 after:2025-07-01"   "type:Test"   "-type:Rest"
+        mask = self.all
+        for term in text.split():
+            negate = term.startswith("-")
+            field, _, value = term.lstrip("-").partition(":")
+            if not value:
+                raise ValueError(f"Expected field:value, got {term!r}")
+            if field == "type":
+                term_mask = self.type(*value.split(","))
+            elif field == "week":
+                term_mask = 0
+                for part in value.split(","):
+                    first, _, last = part.partition("-")
+                    term_mask |= self.weeks(int(first), int(last) if last else None)
+            elif field in ("after", "before", "from", "to"):
+                term_mask = self.dates(**{{"from": "start", "to": "end"}.get(field, field): value})
+            else:
+                raise ValueError(f"Unknown field {field!r}; use type, week, after, before, from or to")
+            mask &= ~term_mask if negate else term_mask
+        return mask & self.all
+
+def _page_days(plan, races):
+    # One entry per day as the calendar shows it: a plan entry takes
+    # precedence over a predefined race on the same day
+    days = list(plan)
+    planned = {entry["date"] for entry in plan}
+    for day, race in sorted((races or {}).items()):
+        if day not in planned:
+            days.append(dict(race, date=day))
+    return days
+
+def filter_sets(plan, races=None):
+    # {filter: [dates]} for the page's legend, so a filter click toggles the
+    # cells of a precomputed set instead of checking every cell's classes
+    query = PlanQuery(_page_days(plan, races))
+    return {name: sorted(entry["date"] for entry in query.select(query.type(*activity_types)))
+            for name, activity_types in FILTER_TYPES.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a parsed plan with bitmap indexes.")
+    parser.add_argument("query", nargs="?", default="",
+                        help='e.g. "type:Bike,Brick week:5-8 after:2025-07-01" (default: everything)')
+    parser.add_argument("--plan", help="Plan JSON (default: the embedded plan, freshly parsed)")
+    parser.add_argument("--count", action="store_true", help="Only print the number of matching entries")
+    parser.add_argument("--filter-sets", action="store_true", help="Print the page's legend filter sets as JSON")
+    parser.add_argument("--races", default=RACES_PATH, help="Predefined races JSON, for --filter-sets")
+    args = parser.parse_args(argv)
+
+    if args.plan:
+        with open(args.plan, "r") as f:
+            plan = json.load(f)
+    else:
+        from parse_plan import parse_training_plan, training_plan_text
+        plan = parse_training_plan(training_plan_text)
+    if args.filter_sets:
+        print(json.dumps(filter_sets(plan, load_races(args.races)), indent=4))
+        return 0
+
+    query = PlanQuery(plan)
+    try:
+        mask = query.query(args.query)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.count:
+        print(query.count(mask))
+        return 0
+    for entry in query.select(mask):
+        print(f"{entry['date']}  week {entry['week']:>2}  {entry['activityType']:<6} {entry['title']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "training_plan_rules.json")
+OVERRIDABLE_FIELDS = ("activityType", "title", "details")
+RULE_KEYS = {"week", "dayOfWeek", "date", "title", "set", "default"}
+
+class OverrideRule:
+    # One compiled correction. `title` is an optional predicate on the entry's
+    # title before the rule is applied. `set` fields are always written,
+    # `default` fields only when the entry's value is empty.
+    __slots__ = ("title", "set_fields", "default_fields")
+
+    def __init__(self, title=None, set_fields=None, default_fields=None):
+        self.title = title
+        self.set_fields = tuple((set_fields or {}).items())
+        self.default_fields = tuple((default_fields or {}).items())
+
+    def matches(self, title):
+        return self.title is None or self.title == title
+
+    def apply(self, entry):
+        for field, value in self.set_fields:
+            entry[field] = value
+        for field, value in self.default_fields:
+            if not (entry.get(field) or "").strip():
+                entry[field] = value
+        return entry
+
+class RuleSet:
+    # Overrides compiled into two indexes: (week, dayOfWeek) rules are applied by
+    # the parser, date rules by the post-processing step. Rules sharing a key are
+    # tried in file order and the first one whose title predicate holds wins.
+    def __init__(self, rules=()):
+        self.by_week_day = {}
+        self.by_date = {}
+        self._digest = hashlib.sha256()
+        for position, rule in enumerate(rules):
+            self.add(rule, position)
+
+    def add(self, rule, position=None):
+        where = f"rule {position}" if position is not None else "rule"
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        for action in ("set", "default"):
+            bad_fields = set(rule.get(action, {})) - set(OVERRIDABLE_FIELDS)
+            if bad_fields:
+                raise ValueError(f"{where}: cannot override {sorted(bad_fields)}")
+        if not rule.get("set") and not rule.get("default"):
+            raise ValueError(f"{where}: needs a 'set' or 'default' action")
+
+        compiled = OverrideRule(rule.get("title"), rule.get("set"), rule.get("default"))
+        if "date" in rule:
+            if "week" in rule or "dayOfWeek" in rule:
+                raise ValueError(f"{where}: use either 'date' or 'week'/'dayOfWeek', not both")
+            self.by_date.setdefault(rule["date"], []).append(compiled)
+        elif "week" in rule and "dayOfWeek" in rule:
+            self.by_week_day.setdefault((int(rule["week"]), rule["dayOfWeek"]), []).append(compiled)
+        else:
+            raise ValueError(f"{where}: needs 'date' or both 'week' and 'dayOfWeek'")
+        self._digest.update(json.dumps(rule, sort_keys=True).encode("utf-8"))
+
+    @property
+    def fingerprint(self):
+        # Changes whenever a rule is added, so caches of parsed output can tell
+        # they were built with different rules
+        return self._digest.hexdigest()
+
+    @staticmethod
+    def _first_match(candidates, title):
+        if candidates:
+            for rule in candidates:
+                if rule.matches(title):
+                    return rule
+        return None
+
+    def match(self, week, day_of_week, title):
+        return self._first_match(self.by_week_day.get((week, day_of_week)), title)
+
+    def match_date(self, date, title):
+        return self._first_match(self.by_date.get(date), title)
+
+def compile_rules(data):
+    # Accepts the parsed rules file ({"version": 1, "rules": [...]}) or a bare list
+    rules = data.get("rules", []) if isinstance(data, dict) else data
+    return RuleSet(rules)
+
+@lru_cache(maxsize=None)
+def load_rules(path=DEFAULT_RULES_PATH):
+    # Compiled once per path and process; the returned RuleSet is shared by every plan
+    with open(path, "r", encoding="utf-8") as f:
+        return compile_rules(json.load(f))
@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from parse_plan import PARSER_VERSION, PLAN_START_DATE
+from plan_pipeline import PlanPipeline
+from plan_rules import load_rules
+from activity_classifier import get_default_classifier
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_ENTRIES = 256
+MAX_BODY_BYTES = 8 << 20  # 8 MiB of plan text per request
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+def compile_plan(text, start_date):
+    # Parse and post-process one plan through the default PlanPipeline stages.
+    # Runs in a worker process, so it takes and returns plain picklable values:
+    # the start date as "YYYY-MM-DD" and the plan as the JSON bytes the
+    # service sends back.
+    entries = PlanPipeline().compile(text, start_date=datetime.fromisoformat(start_date))
+    return json.dumps(entries, indent=4).encode("utf-8")
+
+class PlanService:
+    # Compiles plans on a pool of worker processes and keeps the results in an
+    # LRU keyed by a hash of the request (plan text, start date) and of
+    # everything the output depends on (parser version, rules, classifier).
+    # Identical requests arriving while a compile is running wait for that
+    # compile instead of starting their own.
+    def __init__(self, workers=None, cache_entries=DEFAULT_CACHE_ENTRIES, executor=None):
+        if executor is None:
+            # Workers are started on demand. Forked ones would inherit the
+            # sockets of connections open at that moment and keep them from
+            # closing, so they are spawned fresh instead.
+            executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                           mp_context=multiprocessing.get_context("spawn"))
+        self.executor = executor
+        self.cache_entries = cache_entries
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._version = f"{PARSER_VERSION}\0{load_rules().fingerprint}\0{get_default_classifier().fingerprint}"
+        self.requests = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.compiles = 0
+        self.errors = 0
+
+    def cache_key(self, text, start_date):
+        digest = hashlib.sha256(f"{self._version}\0{start_date}\0".encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    async def compile(self, text, start_date):
+        self.requests += 1
+        key = self.cache_key(text, start_date)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        pending = self._in_flight[key] = loop.run_in_executor(self.executor, compile_plan, text, start_date)
+        self.compiles += 1
+        try:
+            result = await asyncio.shield(pending)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            del self._in_flight[key]
+
+        self._results[key] = result
+        if len(self._results) > self.cache_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "compiles": self.compiles,
+            "errors": self.errors,
+            "cachedPlans": len(self._results),
+            "cacheEntries": self.cache_entries,
+            "inFlight": len(self._in_flight),
+        }
+
+    async def handle_compile(self, body):
+        # {"text": "<plan text>", "startDate": "YYYY-MM-DD"}; startDate is optional
+        try:
+            request = json.loads(body)
+            text = request["text"]
+            start_date = request.get("startDate") or PLAN_START_DATE.date().isoformat()
+            if not isinstance(text, str) or not isinstance(start_date, str):
+                raise TypeError("text and startDate must be strings")
+            start_date = datetime.fromisoformat(start_date).date().isoformat()
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return 400, _error_body(f"Expected {{\"text\": ..., \"startDate\": \"YYYY-MM-DD\"}}: {e}")
+        try:
+            return 200, await self.compile(text, start_date)
+        except Exception as e:
+            return 500, _error_body(f"{type(e).__name__}: {e}")
+
+    async def handle(self, reader, writer):
+        # One HTTP/1.1 request per connection
+        try:
+            try:
+                status, body = await self._respond(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except (ValueError, asyncio.LimitOverrunError):
+                # readline() raises ValueError for a line over the reader's limit
+                status, body = 431, _error_body("Request line or header too long")
+            writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                         "Content-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         "Connection: close\r\n\r\n".encode("ascii") + body)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _respond(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if len(request_line) < 2:
+            return 400, _error_body("Malformed request line")
+        method, path = request_line[0], request_line[1].split("?", 1)[0]
+
+        if path == "/compile":
+            if method != "POST":
+                return 405, _error_body("Use POST")
+            # Digits only: int() would also take "-1", "+5" or "1_000"
+            length = headers.get("content-length", "0")
+            if not (length.isascii() and length.isdigit()):
+                return 400, _error_body("Bad Content-Length")
+            length = int(length)
+            if length > MAX_BODY_BYTES:
+                return 413, _error_body(f"Plans are limited to {MAX_BODY_BYTES} bytes")
+            return await self.handle_compile(await reader.readexactly(length))
+        if path == "/stats" and method == "GET":
+            return 200, json.dumps(self.stats(), indent=4).encode("utf-8")
+        if path == "/health" and method == "GET":
+            return 200, b'{"status": "ok"}'
+        return 404, _error_body(f"No such endpoint: {method} {path}")
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+def _error_body(message):
+    return json.dumps({"error": message}).encode("utf-8")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve plan compilation over localhost HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help="Compiled plans kept in memory")
+    args = parser.parse_args(argv)
+
+    service = PlanService(workers=args.workers, cache_entries=args.cache_entries)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Compiling plans at {where} (POST /compile, GET /stats)", file=sys.stderr)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import json
+from time import perf_counter
+
+class _StageTimer:
+    def __init__(self, stats, name, entries):
+        self.stats = stats
+        self.name = name
+        self.entries = entries
+
+    def __enter__(self):
+        self.stats._nested.append(0.0)
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats._finish(self.name, perf_counter() - self.started, self.entries)
+        return False
+
+class PipelineStats:
+    # Opt-in instrumentation for the parse and post-processing pipelines.
+    # Each stage accumulates wall time, calls and entries (or tokens, for the
+    # scanner) processed. Times are exclusive: a stage that pulls from another
+    # one, like grouping pulling tokens from the scanner, is charged only for
+    # its own work, so the stage times add up to the pipeline's total.
+    #
+    # Functions take `stats=None` and only wrap their hot paths when a
+    # PipelineStats is passed, so the uninstrumented path is unchanged.
+    def __init__(self):
+        self.stages = {}
+        self._nested = [0.0]  # Time spent in stages nested inside the running one
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"seconds": 0.0, "calls": 0, "entries": 0}
+        return stage
+
+    def _finish(self, name, elapsed, entries):
+        inner = self._nested.pop()
+        self._nested[-1] += elapsed
+        stage = self._stage(name)
+        stage["seconds"] += elapsed - inner
+        stage["calls"] += 1
+        stage["entries"] += entries
+
+    def record(self, name, seconds, calls=1, entries=0):
+        stage = self._stage(name)
+        stage["seconds"] += seconds
+        stage["calls"] += calls
+        stage["entries"] += entries
+
+    def stage(self, name, entries=0):
+        # with stats.stage("serialize", entries=len(plan)): ...
+        return _StageTimer(self, name, entries)
+
+    def timed(self, name, func, count=None):
+        # Wraps a function; count(result) gives the entries it processed
+        nested = self._nested
+        finish = self._finish
+
+        def wrapper(*args, **kwargs):
+            nested.append(0.0)
+            started = perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                finish(name, perf_counter() - started, count(result) if count is not None and result is not None else 0)
+        return wrapper
+
+    def timed_iter(self, name, iterable, count=None):
+        # Wraps an iterator, charging the stage for the time spent producing
+        # each item (not for what the consumer does with it). Every item counts
+        # as one entry unless count(item) says otherwise.
+        nested = self._nested
+        finish = self._finish
+        iterator = iter(iterable)
+        while True:
+            nested.append(0.0)
+            started = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                finish(name, perf_counter() - started, 0)
+                return
+            except BaseException:
+                finish(name, perf_counter() - started, 0)
+                raise
+            finish(name, perf_counter() - started, 1 if count is None else count(item))
+            yield item
+
+    def total_seconds(self):
+        return sum(stage["seconds"] for stage in self.stages.values())
+
+    def summary(self):
+        total = self.total_seconds()
+        return {
+            "totalSeconds": round(total, 6),
+            "stages": {
+                name: {
+                    "seconds": round(stage["seconds"], 6),
+                    "share": round(stage["seconds"] / total, 4) if total else 0.0,
+                    "calls": stage["calls"],
+                    "entries": stage["entries"],
+                }
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def format_summary(self):
+        summary = self.summary()
+        lines = [f"{'stage':<16} {'seconds':>10} {'share':>7} {'calls':>9} {'entries':>10}"]
+        for name, stage in summary["stages"].items():
+            lines.append(f"{name:<16} {stage['seconds']:>10.4f} {stage['share'] * 100:>6.1f}% "
+                         f"{stage['calls']:>9} {stage['entries']:>10}")
+        lines.append(f"{'total':<16} {summary['totalSeconds']:>10.4f}")
+        return "\n".join(lines)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+
+def report_profile(stats, destination, out):
+    # Backs the --profile option of the CLIs: "-" prints a table to `out`,
+    # anything else is a path for the JSON summary
+    if destination == "-":
+        print(stats.format_summary(), file=out)
+    else:
+        stats.write(destination)
+        print(f"Profile saved to {destination}", file=out)
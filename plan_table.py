@@ -0,0 +1,197 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+
+from parse_plan import DAY_OF_WEEK_MAP, DAY_INDEX, date_ordinal, iso_date
+
+# Categorical codes for activityType. Types not listed here are appended to
+# the table's own category list when first seen.
+ACTIVITY_TYPES = ("Rest", "Swim", "Bike", "Run", "Brick", "Test", "Race", "Unknown")
+
+def mask_and(*masks):
+    # Masks are bytes with one 0/1 byte per row, so the bytewise AND of two
+    # masks is the AND of the big integers they spell
+    result = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        result &= int.from_bytes(mask, "little")
+    return result.to_bytes(len(masks[0]), "little")
+
+def mask_or(*masks):
+    result = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        result |= int.from_bytes(mask, "little")
+    return result.to_bytes(len(masks[0]), "little")
+
+def mask_not(mask):
+    return mask.translate(bytes([1, 0]) + bytes(254))
+
+class StringTable:
+    # Each distinct title/details string is stored once and referenced by index
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def intern(self, value):
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+    def __len__(self):
+        return len(self.strings)
+
+class PlanTable:
+    # Column store for many parsed plans. One row per entry: week and dayOfWeek
+    # as small ints, the date as an ordinal (date.toordinal()), activityType as
+    # a categorical code, and title/details as indexes into a shared StringTable.
+    # Filters return row masks (bytes of 0/1) that combine with mask_and/mask_or.
+    def __init__(self, strings=None, activity_types=ACTIVITY_TYPES):
+        self.plan = array("I")      # Which plan (athlete) the row came from
+        self.week = array("B")
+        self.day = array("B")       # Index into DAY_OF_WEEK_MAP
+        self.date = array("i")
+        self.type_code = array("B")
+        self.title = array("I")
+        self.details = array("I")
+        self.strings = strings if strings is not None else StringTable()
+        self.activity_types = list(activity_types)
+        self._type_codes = {name: code for code, name in enumerate(self.activity_types)}
+        self.plan_count = 0
+        self._date_order = None
+
+    @classmethod
+    def from_entries(cls, entries, strings=None):
+        table = cls(strings)
+        table.append_plan(entries)
+        return table
+
+    @classmethod
+    def from_plans(cls, plans, strings=None):
+        table = cls(strings)
+        for entries in plans:
+            table.append_plan(entries)
+        return table
+
+    def _type_code(self, activity_type):
+        code = self._type_codes.get(activity_type)
+        if code is None:
+            code = self._type_codes[activity_type] = len(self.activity_types)
+            self.activity_types.append(activity_type)
+        return code
+
+    def append_plan(self, entries):
+        # Appends one plan in parse_training_plan's output shape; returns its plan id
+        plan_id = self.plan_count
+        intern = self.strings.intern
+        for entry in entries:
+            self.plan.append(plan_id)
+            self.week.append(entry["week"])
+            self.day.append(DAY_INDEX[entry["dayOfWeek"]])
+            self.date.append(date_ordinal(entry["date"]))
+            self.type_code.append(self._type_code(entry["activityType"]))
+            self.title.append(intern(entry["title"]))
+            self.details.append(intern(entry["details"]))
+        self.plan_count += 1
+        self._date_order = None
+        return plan_id
+
+    def __len__(self):
+        return len(self.date)
+
+    def row(self, idx):
+        return {
+            "week": self.week[idx],
+            "dayOfWeek": DAY_OF_WEEK_MAP[self.day[idx]],
+            "date": iso_date(self.date[idx]),
+            "activityType": self.activity_types[self.type_code[idx]],
+            "title": self.strings[self.title[idx]],
+            "details": self.strings[self.details[idx]],
+        }
+
+    def rows(self, mask):
+        return list(compress(range(len(self)), mask))
+
+    def to_entries(self, mask=None):
+        # Back to the training_plan.json shape, for all rows or the masked ones
+        indexes = range(len(self)) if mask is None else self.rows(mask)
+        return [self.row(idx) for idx in indexes]
+
+    def to_plans(self):
+        plans = [[] for _ in range(self.plan_count)]
+        for idx in range(len(self)):
+            plans[self.plan[idx]].append(self.row(idx))
+        return plans
+
+    def select(self, mask):
+        # A new table holding only the masked rows; strings stay shared
+        table = PlanTable(self.strings, self.activity_types)
+        for name in ("plan", "week", "day", "date", "type_code", "title", "details"):
+            column = getattr(self, name)
+            setattr(table, name, array(column.typecode, compress(column, mask)))
+        table.plan_count = self.plan_count
+        return table
+
+    def type_mask(self, *activity_types):
+        lookup = bytearray(256)
+        for activity_type in activity_types:
+            code = self._type_codes.get(activity_type)
+            if code is not None:
+                lookup[code] = 1
+        return self.type_code.tobytes().translate(lookup)
+
+    def week_mask(self, first, last=None):
+        # Weeks first..last inclusive
+        last = first if last is None else last
+        lookup = bytearray(256)
+        for week in range(max(first, 0), min(last, 255) + 1):
+            lookup[week] = 1
+        return self.week.tobytes().translate(lookup)
+
+    def day_mask(self, *days_of_week):
+        lookup = bytearray(256)
+        for day in days_of_week:
+            lookup[DAY_INDEX[day]] = 1
+        return self.day.tobytes().translate(lookup)
+
+    def date_mask(self, start=None, end=None):
+        # Dates start..end inclusive, found through a date-sorted row index
+        if self._date_order is None:
+            order = sorted(range(len(self)), key=self.date.__getitem__)
+            self._date_order = (array("I", order), array("i", (self.date[idx] for idx in order)))
+        order, sorted_dates = self._date_order
+        lo = 0 if start is None else bisect_left(sorted_dates, date_ordinal(start))
+        hi = len(order) if end is None else bisect_right(sorted_dates, date_ordinal(end))
+        if hi - lo == len(order):
+            return b"\x01" * len(order)
+        mask = bytearray(len(self))
+        for idx in order[lo:hi]:
+            mask[idx] = 1
+        return bytes(mask)
+
+    def filter(self, activity_types=None, start=None, end=None, weeks=None):
+        # Combined filter; `weeks` is a (first, last) pair. Returns a new table.
+        masks = []
+        if activity_types is not None:
+            masks.append(self.type_mask(*activity_types))
+        if start is not None or end is not None:
+            masks.append(self.date_mask(start, end))
+        if weeks is not None:
+            masks.append(self.week_mask(*weeks))
+        if not masks:
+            return self.select(b"\x01" * len(self))
+        return self.select(mask_and(*masks))
+
+    def type_counts(self, mask=None):
+        codes = self.type_code.tobytes()
+        if mask is not None:
+            codes = bytes(compress(codes, mask))
+        counts = {}
+        for code, name in enumerate(self.activity_types):
+            count = codes.count(code)
+            if count:
+                counts[name] = count
+        return counts
@@ -0,0 +1,165 @@
+import sys
+import json
+import argparse
+from datetime import date, datetime
+
+from parse_plan import DAY_OF_WEEK_MAP, DAY_INDEX, date_ordinal, iso_date, training_plan_text
+from plan_pipeline import DEFAULT_STAGES, PlanPipeline
+
+class PlanTemplate:
+    # A plan parsed once and shared by every athlete on it. Days are stored as
+    # parallel tuples (offset from the first day, week, day index, activity
+    # type, title, details), so the template can't be changed after it is
+    # built and the strings exist once however many schedules use them.
+    __slots__ = ("offsets", "weeks", "days", "activity_types", "titles", "details",
+                 "start_ordinal", "race_offset", "_position_of_offset")
+
+    def __init__(self, entries):
+        entries = list(entries)
+        if not entries:
+            raise ValueError("A template needs at least one entry")
+        ordinals = [date_ordinal(entry["date"]) for entry in entries]
+        start = min(ordinals)
+        self.start_ordinal = start  # Where the entries were dated when parsed
+        self.offsets = tuple(ordinal - start for ordinal in ordinals)
+        self.weeks = tuple(entry["week"] for entry in entries)
+        self.days = tuple(DAY_INDEX[entry["dayOfWeek"]] for entry in entries)
+        self.activity_types = tuple(entry["activityType"] for entry in entries)
+        self.titles = tuple(entry["title"] for entry in entries)
+        self.details = tuple(entry["details"] for entry in entries)
+        races = [offset for offset, activity_type in zip(self.offsets, self.activity_types) if activity_type == "Race"]
+        # Race day anchors race-date scheduling; a plan without one ends on its last day
+        self.race_offset = races[-1] if races else max(self.offsets)
+        position_of_offset = {}
+        for position, offset in enumerate(self.offsets):
+            position_of_offset.setdefault(offset, position)
+        self._position_of_offset = position_of_offset
+
+    @classmethod
+    def from_text(cls, text, stages=DEFAULT_STAGES, **pipeline_options):
+        # Parsed and post-processed through a PlanPipeline, so templates hold
+        # the same entries training_plan.json would. Date-specific overrides
+        # (the 2025-08-17 race name) are applied at the template's own dates
+        # and travel with the template to every schedule.
+        return cls(PlanPipeline(stages, **pipeline_options).run(text))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def start_weekday(self):
+        return (self.start_ordinal - 1) % 7  # 0 is Monday, as in DAY_OF_WEEK_MAP
+
+    def _shift(self, start_ordinal):
+        # Days to add to the template's own dates. Plans are laid out in
+        # weeks, so the shift is rounded down to whole weeks and every workout
+        # keeps its weekday: the plan starts on its usual weekday on or before
+        # the requested date.
+        return (start_ordinal - self.start_ordinal) // 7 * 7
+
+    def schedule(self, start_date=None, race_date=None):
+        # One athlete's plan by start date or by race date. This is O(1): the
+        # Schedule is the template plus an ordinal offset, dated on demand.
+        if (start_date is None) == (race_date is None):
+            raise ValueError("Give exactly one of start_date or race_date")
+        if start_date is not None:
+            shift = self._shift(date_ordinal(start_date))
+        else:
+            shift = self._shift(date_ordinal(race_date) - self.race_offset)
+        return Schedule(self, shift)
+
+    def schedules(self, start_dates=None, race_dates=None):
+        if race_dates is not None:
+            return [self.schedule(race_date=race_date) for race_date in race_dates]
+        return [self.schedule(start_date=start_date) for start_date in start_dates]
+
+class Schedule:
+    # A template placed on the calendar for one athlete
+    __slots__ = ("template", "shift")
+
+    def __init__(self, template, shift):
+        self.template = template
+        self.shift = shift
+
+    @property
+    def start_ordinal(self):
+        return self.template.start_ordinal + self.shift
+
+    @property
+    def start_date(self):
+        return date.fromordinal(self.start_ordinal)
+
+    @property
+    def race_date(self):
+        return date.fromordinal(self.start_ordinal + self.template.race_offset)
+
+    def __len__(self):
+        return len(self.template)
+
+    def entry(self, position):
+        t = self.template
+        return {
+            "week": t.weeks[position],
+            "dayOfWeek": DAY_OF_WEEK_MAP[t.days[position]],
+            "date": iso_date(self.start_ordinal + t.offsets[position]),
+            "activityType": t.activity_types[position],
+            "title": t.titles[position],
+            "details": t.details[position]
+        }
+
+    __getitem__ = entry
+
+    def __iter__(self):
+        t = self.template
+        start = self.start_ordinal
+        for week, day, offset, activity_type, title, details in zip(
+                t.weeks, t.days, t.offsets, t.activity_types, t.titles, t.details):
+            ordinal = start + offset
+            yield {
+                "week": week,
+                "dayOfWeek": DAY_OF_WEEK_MAP[day],
+                "date": iso_date(ordinal),
+                "activityType": activity_type,
+                "title": title,
+                "details": details
+            }
+
+    def entries(self):
+        # The plan in training_plan.json's shape; strings are the template's own
+        return list(self)
+
+    def entry_for_date(self, value):
+        position = self.template._position_of_offset.get(date_ordinal(value) - self.start_ordinal)
+        return None if position is None else self.entry(position)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule a plan template for one athlete.")
+    parser.add_argument("input", nargs="?", help="Plan text file (default: the embedded plan)")
+    when = parser.add_mutually_exclusive_group(required=True)
+    when.add_argument("--start-date", help="Start the plan the week of YYYY-MM-DD")
+    when.add_argument("--race-date", help="Finish the plan with its race on or before YYYY-MM-DD")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = training_plan_text
+    template = PlanTemplate.from_text(text)
+    schedule = template.schedule(
+        start_date=datetime.fromisoformat(args.start_date) if args.start_date else None,
+        race_date=datetime.fromisoformat(args.race_date) if args.race_date else None)
+
+    plan = json.dumps(schedule.entries(), indent=4)
+    if args.output == "-":
+        print(plan)
+    else:
+        with open(args.output, "w") as f:
+            f.write(plan)
+        print(f"Scheduled {len(schedule)} entries from {schedule.start_date} to race day {schedule.race_date}",
+              file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
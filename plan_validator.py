@@ -0,0 +1,192 @@
+import sys
+import json
+import argparse
+from collections import namedtuple
+from functools import lru_cache
+
+from parse_plan import DAY_OF_WEEK_MAP, date_ordinal
+
+VALID_ACTIVITY_TYPES = ["Swim", "Run", "Bike", "Brick", "Rest", "Race"]
+
+# Schemas are plain JSON-style dicts, so they can also be loaded from a file
+# (--schema). "daysPerWeek" is exact when set; every week is at most 7 days
+# long either way. "races" and "weeks" are exact counts, or None to skip.
+RAW_SCHEMA = {
+    "fields": {"week": "int", "dayOfWeek": "str", "date": "str", "activityType": "str",
+               "title": "str", "details": "str"},
+    "activityTypes": VALID_ACTIVITY_TYPES + ["Test"],
+    "firstWeek": 1,
+    "daysPerWeek": 7,
+    "contiguousDates": True,
+    "races": 1,
+    "weeks": None,
+}
+# After process_training_plan.py: tests are dropped, which leaves gaps
+PROCESSED_SCHEMA = dict(RAW_SCHEMA, activityTypes=list(VALID_ACTIVITY_TYPES),
+                        daysPerWeek=None, contiguousDates=False)
+SCHEMAS = {"raw": RAW_SCHEMA, "processed": PROCESSED_SCHEMA}
+
+_FIELD_TYPES = {"int": int, "str": str}
+DATE_CACHE_SIZE = 4096
+
+# position is the entry's index in the plan, or None for whole-plan checks
+Violation = namedtuple("Violation", "position date rule message")
+# Rules an entry can break on its own, without the entries around it
+ENTRY_RULES = frozenset(("field", "activityType", "date", "dayOfWeek"))
+
+class PlanWarning(UserWarning):
+    # An entry that breaks the schema, reported while a plan is processed
+    pass
+
+def format_violation(violation):
+    where = "plan" if violation.position is None else f"entry {violation.position}"
+    if violation.date:
+        where += f" ({violation.date})"
+    return f"{where}: {violation.message}"
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _date_ordinal(value):
+    # Plans in a batch share most of their dates. Only ISO strings count as
+    # dates in a plan, though date_ordinal also takes ordinals and date objects.
+    if not isinstance(value, str):
+        raise TypeError(f"{value!r} is not a date string")
+    return date_ordinal(value)
+
+class PlanValidator:
+    # Checks every invariant of a schema in one pass over a plan and reports
+    # all violations instead of stopping at the first. The schema is turned
+    # into lookup tables once, so one validator can be reused for every plan
+    # in a batch.
+    def __init__(self, schema=RAW_SCHEMA):
+        self.schema = schema
+        self.fields = tuple((name, _FIELD_TYPES[kind]) for name, kind in schema["fields"].items())
+        self.activity_types = frozenset(schema["activityTypes"])
+        self.first_week = schema.get("firstWeek")
+        self.days_per_week = schema.get("daysPerWeek")
+        self.contiguous = schema.get("contiguousDates", False)
+        self.races = schema.get("races")
+        self.weeks = schema.get("weeks")
+
+    def validate(self, entries):
+        # A list of Violations, empty when the plan is valid. `entries` can be
+        # any iterable; it is read once.
+        violations = []
+        add = violations.append
+        fields = self.fields
+        activity_types = self.activity_types
+        contiguous = self.contiguous
+        days_per_week = self.days_per_week
+
+        previous = None  # Ordinal of the last entry with a valid date
+        week = week_start = None
+        week_days = 0
+        races = weeks = 0
+        position = -1
+        for position, entry in enumerate(entries):
+            day = entry.get("date") if isinstance(entry, dict) else None
+            if day is None:
+                add(Violation(position, None, "field", "entry has no date" if isinstance(entry, dict)
+                              else f"entry is a {type(entry).__name__}, not an object"))
+                continue
+            for name, kind in fields:
+                value = entry.get(name)
+                if type(value) is not kind:
+                    add(Violation(position, day, "field", f"{name} is {value!r}, expected {kind.__name__}"))
+            activity_type = entry.get("activityType")
+            if activity_type not in activity_types:
+                add(Violation(position, day, "activityType", f"activityType {activity_type!r} is not allowed"))
+            elif activity_type == "Race":
+                races += 1
+
+            entry_week = entry.get("week")
+            if entry_week != week:
+                if week is not None and days_per_week and week_days != days_per_week:
+                    add(Violation(position - 1, None, "week", f"week {week} has {week_days} days, "
+                                                              f"expected {days_per_week}"))
+                expected_week = self.first_week if week is None else week + 1
+                if expected_week is not None and entry_week != expected_week:
+                    add(Violation(position, day, "week", f"week {entry_week!r} where week {expected_week} "
+                                                         f"was expected"))
+                week, week_start, week_days = entry_week, None, 0
+                weeks += 1
+            week_days += 1
+
+            try:
+                ordinal = _date_ordinal(day)
+            except (TypeError, ValueError):
+                add(Violation(position, day, "date", f"date {day!r} is not YYYY-MM-DD"))
+                continue
+            # (ordinal - 1) % 7 indexes DAY_OF_WEEK_MAP (ordinal 1 is a Monday)
+            weekday = DAY_OF_WEEK_MAP[(ordinal - 1) % 7]
+            if weekday != entry.get("dayOfWeek"):
+                add(Violation(position, day, "dayOfWeek", f"{day} is a {weekday}, "
+                                                          f"not {entry.get('dayOfWeek')}"))
+            if previous is not None:
+                if ordinal <= previous:
+                    add(Violation(position, day, "order", "date does not follow the previous entry's"))
+                elif contiguous and ordinal != previous + 1:
+                    add(Violation(position, day, "gap", f"{ordinal - previous - 1} missing days before this entry"))
+            previous = ordinal
+            if week_start is None:
+                week_start = ordinal
+            elif ordinal - week_start > 6:
+                add(Violation(position, day, "week", f"week {week} spans more than 7 days"))
+
+        if week is not None and days_per_week and week_days != days_per_week:
+            add(Violation(position, None, "week", f"week {week} has {week_days} days, expected {days_per_week}"))
+        if position < 0:
+            add(Violation(None, None, "empty", "plan has no entries"))
+        if self.races is not None and races != self.races:
+            add(Violation(None, None, "races", f"{races} Race entries, expected {self.races}"))
+        if self.weeks is not None and weeks != self.weeks:
+            add(Violation(None, None, "weeks", f"{weeks} weeks, expected {self.weeks}"))
+        return violations
+
+    def check_entry(self, entry):
+        # The ENTRY_RULES violations of a single entry
+        return [violation for violation in self.validate((entry,)) if violation.rule in ENTRY_RULES]
+
+_validators = {}
+
+def get_validator(name="raw"):
+    # One compiled validator per built-in schema and process
+    validator = _validators.get(name)
+    if validator is None:
+        validator = _validators[name] = PlanValidator(SCHEMAS[name])
+    return validator
+
+def validate_plan(entries, schema="raw"):
+    return get_validator(schema).validate(entries)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check plan JSON files against a schema and plan invariants.")
+    parser.add_argument("plans", nargs="*", default=["training_plan.json"], help="Plan JSON files")
+    parser.add_argument("--schema", default="processed",
+                        help="Built-in schema (raw, processed) or a JSON schema file (default: processed)")
+    parser.add_argument("--weeks", type=int, default=None, help="Also require this many weeks")
+    args = parser.parse_args(argv)
+
+    if args.schema in SCHEMAS:
+        schema = SCHEMAS[args.schema]
+    else:
+        with open(args.schema, "r") as f:
+            schema = dict(RAW_SCHEMA, **json.load(f))
+    if args.weeks is not None:
+        schema = dict(schema, weeks=args.weeks)
+    validator = PlanValidator(schema)
+
+    invalid = 0
+    for path in args.plans:
+        with open(path, "r") as f:
+            violations = validator.validate(json.load(f))
+        if violations:
+            invalid += 1
+            print(f"{path}: {len(violations)} violations")
+            for violation in violations:
+                print(f"  {format_violation(violation)}")
+        else:
+            print(f"{path}: OK")
+    return 1 if invalid else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
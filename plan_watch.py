@@ -0,0 +1,301 @@
+import os
+import re
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+from plan_rules import DEFAULT_RULES_PATH, compile_rules
+from plan_pipeline import PlanPipeline
+from plan_index import build_date_index
+from plan_query import filter_sets
+from plan_diff import diff_plans
+from render_calendar import RACES_PATH, PAGE_PATH, PLAN_PATH, MONTH_TABLE, load_races, render_month
+from update_page import (PLAN_BLOCK_ID, INDEX_BLOCK_ID, RACES_BLOCK_ID, FILTERS_BLOCK_ID,
+                         block_pattern, embed_json, plan_block, read_plan_block, render_page)
+
+SOURCE_PATH = "parse_plan.py"  # The plan text lives in parse_plan.py as training_plan_text
+POLL_SECONDS = 0.02
+DEBOUNCE_SECONDS = 0.03  # A burst of saves is handled once, this long after the last one
+_SOURCE_LITERAL = re.compile(r'^training_plan_text = ("""(?:.|\n)*?""")', re.MULTILINE)
+_MONTH_TABLE_BYTES = re.compile(MONTH_TABLE.pattern.encode("utf-8"), re.DOTALL)
+_BLOCK_PATTERNS = {block_id: re.compile(block_pattern(block_id).pattern.encode("utf-8"), re.DOTALL)
+                   for block_id in (PLAN_BLOCK_ID, INDEX_BLOCK_ID, RACES_BLOCK_ID, FILTERS_BLOCK_ID)}
+
+def read_plan_source(path):
+    # Plan text from a .txt file, or training_plan_text out of a .py file
+    # without importing it
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if not path.endswith(".py"):
+        return text
+    match = _SOURCE_LITERAL.search(text)
+    if match is None:
+        raise ValueError(f"No training_plan_text in {path}")
+    return ast.literal_eval(match.group(1))
+
+def atomic_write(path, data):
+    # Readers see the old file or the new one, never a partial write
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+class PagePatcher:
+    # Keeps the page's bytes and the byte spans of its JSON block bodies and
+    # month <tbody> contents, so an update splices new bytes in at known
+    # offsets instead of rendering the page again. The spans are shifted
+    # after each splice; the page is re-read only if something else wrote it.
+    def __init__(self, path):
+        self.path = path
+        self._load()
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            self.page = f.read()
+        self._stat = _stat(self.path)
+        self.spans = {}
+        for block_id, pattern in _BLOCK_PATTERNS.items():
+            match = pattern.search(self.page)
+            if match is not None:
+                self.spans[block_id] = (match.start(2), match.end(2))
+        for match in _MONTH_TABLE_BYTES.finditer(self.page):
+            # (year, 0-based month): from the end of "<tbody" to "</tbody>"
+            self.spans[int(match.group(3)), int(match.group(2))] = (match.end(1), match.start(5))
+
+    def block(self, block_id):
+        start, end = self.spans[block_id]
+        return self.page[start:end].decode("utf-8")
+
+    def months(self):
+        return [key for key in self.spans if isinstance(key, tuple)]
+
+    def patch(self, replacements):
+        # replacements: {block id or (year, month): new bytes for the span}
+        if _stat(self.path) != self._stat:
+            self._load()
+        missing = [key for key in replacements if key not in self.spans]
+        if missing:
+            raise KeyError(f"Page has no span for {missing}")
+        pieces, position, shifts = [], 0, []
+        for key, (start, end) in sorted(self.spans.items(), key=lambda item: item[1][0]):
+            if key not in replacements:
+                continue
+            pieces.append(self.page[position:start])
+            pieces.append(replacements[key])
+            position = end
+            shifts.append((start, len(replacements[key]) - (end - start)))
+        pieces.append(self.page[position:])
+        self.page = b"".join(pieces)
+
+        spans = {}
+        for key, (start, end) in self.spans.items():
+            delta = sum(change for shift_start, change in shifts if shift_start < start)
+            if key in replacements:
+                spans[key] = (start + delta, start + delta + len(replacements[key]))
+            else:
+                spans[key] = (start + delta, end + delta)
+        self.spans = spans
+        atomic_write(self.path, self.page)
+        self._stat = _stat(self.path)
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+def _months_of(dates):
+    return {(int(day[:4]), int(day[5:7]) - 1) for day in dates}
+
+class PlanWatcher:
+    # Watches the plan source, the rules file and the predefined races and
+    # keeps training_plan.json and index.html in step with them. Only the
+    # stages a change affects are re-run: rules or source -> parse and post-
+    # process; races -> nothing but the page. Only the page spans whose
+    # content changed are rewritten: the plan, index and filter blocks, and
+    # the month tables with a changed day.
+    def __init__(self, source=SOURCE_PATH, rules_path=DEFAULT_RULES_PATH, races_path=RACES_PATH,
+                 page_path=PAGE_PATH, plan_path=PLAN_PATH, log=sys.stderr):
+        self.paths = {"source": source, "rules": rules_path, "races": races_path}
+        self.page_path = page_path
+        self.plan_path = plan_path
+        self.log = log
+        self._stats = {name: _stat(path) for name, path in self.paths.items()}
+        self._digests = {}
+        self.page = None
+        self.rules = self.text = self.races = self.plan = None
+
+    def _changed_files(self):
+        changed = set()
+        for name, path in self.paths.items():
+            stat = _stat(path)
+            if stat != self._stats[name]:
+                self._stats[name] = stat
+                changed.add(name)
+        return changed
+
+    def _content_changed(self, names):
+        # Drops files that were saved without changing (editors, touch).
+        # Returns the changed names and their new digests, which the caller
+        # records once it has brought the outputs up to date.
+        changed = {}
+        for name in names:
+            digest = _digest(self.paths[name])
+            if digest != self._digests.get(name):
+                changed[name] = digest
+        return changed
+
+    def sync(self, changed=("source", "rules", "races")):
+        # Brings the outputs up to date after `changed` files changed. Returns
+        # a short description of what was rewritten, or None if nothing was.
+        # The new state is only kept once every write has succeeded, so a
+        # failed sync is redone in full by the next one.
+        digests = self._content_changed(changed)
+        changed = set(digests)
+        if not changed:
+            return None
+        if self.page is None:
+            self.page = PagePatcher(self.page_path)
+        page = self.page
+
+        rules, text, races = self.rules, self.text, self.races
+        if "rules" in changed or rules is None:
+            with open(self.paths["rules"], "r", encoding="utf-8") as f:
+                rules = compile_rules(json.load(f))
+        if "source" in changed or text is None:
+            text = read_plan_source(self.paths["source"])
+        if "races" in changed or races is None:
+            races = load_races(self.paths["races"])
+
+        # Without a previous state the page's blocks stand in for it; a page
+        # missing one of them (None here) is re-rendered in full below
+        old_races = self.races
+        if old_races is None and RACES_BLOCK_ID in page.spans:
+            old_races = json.loads(page.block(RACES_BLOCK_ID))
+        old_plan = self.plan
+        if old_plan is None and PLAN_BLOCK_ID in page.spans:
+            old_plan = read_plan_block(page.block(PLAN_BLOCK_ID))
+        plan = old_plan
+        if changed & {"source", "rules"} or plan is None:
+            plan = PlanPipeline(rules=rules).compile(text)
+
+        dates = set()
+        replacements = {}
+        if plan != old_plan:
+            if old_plan is not None:
+                diff = diff_plans(old_plan, plan)
+                dates.update(entry["date"] for entry in diff["added"] + diff["removed"])
+                dates.update(change["date"] for change in diff["changed"])
+            replacements[PLAN_BLOCK_ID] = plan_block(plan)
+            replacements[INDEX_BLOCK_ID] = embed_json(build_date_index(plan), indent=None)
+            atomic_write(self.plan_path, json.dumps(plan, indent=4).encode("utf-8"))
+        if races != old_races:
+            if old_races is not None:
+                dates.update(day for day in set(old_races) | set(races)
+                             if old_races.get(day) != races.get(day))
+            replacements[RACES_BLOCK_ID] = embed_json(races)
+        if not replacements:
+            self._remember(digests, rules, text, races, plan)
+            return None
+        replacements[FILTERS_BLOCK_ID] = embed_json(filter_sets(plan, races), indent=None)
+
+        new_months = _months_of(dates) - set(page.months())
+        if new_months or any(block_id not in page.spans for block_id in _BLOCK_PATTERNS):
+            # A page without every block, or without a table for a month the
+            # change touches, is brought up to date in full. render_page only
+            # fills the month tables the page has, so a month still without
+            # one is reported rather than left silently stale.
+            with open(self.page_path, "r", encoding="utf-8") as f:
+                html = f.read()
+            atomic_write(self.page_path, render_page(html, plan, races).encode("utf-8"))
+            self.page = PagePatcher(self.page_path)
+            self._remember(digests, rules, text, races, plan)
+            result = f"re-rendered {self.page_path}"
+            missing = sorted(new_months - set(self.page.months()))
+            if missing:
+                result += "; no month table for " + ", ".join(f"{year}-{month + 1:02d}" for year, month in missing)
+            return result
+
+        months = sorted(_months_of(dates))
+        date_index = build_date_index(plan)
+        for year, month in months:
+            replacements[year, month] = (' data-rendered="true">'
+                                         + render_month(year, month, plan, races, date_index))
+        page.patch({key: value.encode("utf-8") for key, value in replacements.items()})
+        self._remember(digests, rules, text, races, plan)
+        what = ", ".join(sorted(changed))
+        where = ", ".join(f"{year}-{month + 1:02d}" for year, month in months) or "no month tables"
+        return f"{what} changed: {len(dates)} days, {where}"
+
+    def _remember(self, digests, rules, text, races, plan):
+        self._digests.update(digests)
+        self.rules, self.text, self.races, self.plan = rules, text, races, plan
+
+    def watch(self):
+        # Polls file stats (cheap: three stat calls per tick) and handles a
+        # burst of saves once it has been quiet for DEBOUNCE_SECONDS
+        print(f"Watching {', '.join(self.paths.values())} -> {self.page_path}", file=self.log)
+        result = self.sync()
+        print(f"Initial sync: {result or 'up to date'}", file=self.log)
+        while True:
+            changed = self._changed_files()
+            if not changed:
+                time.sleep(POLL_SECONDS)
+                continue
+            started = time.perf_counter()
+            quiet_since = started
+            while time.perf_counter() - quiet_since < DEBOUNCE_SECONDS:
+                time.sleep(POLL_SECONDS / 2)
+                more = self._changed_files()
+                if more:
+                    changed |= more
+                    quiet_since = time.perf_counter()
+            try:
+                result = self.sync(changed)
+            except Exception as e:  # A half-edited file shouldn't stop the watch
+                print(f"Update failed: {type(e).__name__}: {e}", file=self.log)
+                continue
+            if result:
+                elapsed = (time.perf_counter() - quiet_since) * 1000
+                print(f"Updated {self.page_path} in {elapsed:.1f} ms after the last save ({result})", file=self.log)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep index.html in step with the plan source as it is edited.")
+    parser.add_argument("--source", default=SOURCE_PATH, help="Plan text file, or a .py file with training_plan_text")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="Rules file")
+    parser.add_argument("--races", default=RACES_PATH, help="Predefined races JSON")
+    parser.add_argument("--page", default=PAGE_PATH, help="Page to patch")
+    parser.add_argument("--plan", default=PLAN_PATH, help="Processed plan JSON to keep updated")
+    parser.add_argument("--once", action="store_true", help="Sync once and exit")
+    args = parser.parse_args(argv)
+
+    watcher = PlanWatcher(args.source, args.rules, args.races, args.page, args.plan)
+    if args.once:
+        result = watcher.sync()
+        print(result or "Up to date", file=sys.stderr)
+        return 0
+    try:
+        watcher.watch()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
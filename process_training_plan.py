@@ -1,42 +1,192 @@
+import re
+import sys
 import json
+import argparse
+import warnings
 
-def modify_training_plan(file_path="training_plan.json"):
-    with open(file_path, 'r') as f:
-        training_plan = json.load(f)
-
-    modified_plan = []
-    valid_activity_types = ["Swim", "Run", "Bike", "Brick", "Rest", "Race"]
-
-    for entry in training_plan:
-        if entry.get("activityType") == "Test":
-            continue  # Skip entries with activityType "Test"
-
-        if entry.get("date") == "2025-08-17":
-            entry["title"] = "Toronto Island Multisport Triathlon"
-            entry["activityType"] = "Race"
-        
-        # Ensure all other activityType values are valid
-        if entry.get("activityType") not in valid_activity_types:
-            # Decide on a default or raise an error if necessary.
-            # For now, let's assume we remove entries with invalid activity types
-            # or correct them if a specific logic is defined.
-            # Given the instructions, we are to ensure they are valid,
-            # implying correction or removal. If an unknown type not "Test"
-            # and not the "2025-08-17" entry appears, it's an issue.
-            # However, the problem implies ensuring *other* activity types are
-            # one of the listed, suggesting entries not matching these (after "Test"
-            # removal and "2025-08-17" update) are problematic.
-            # For now, we'll assume all other types are already valid or this check
-            # is for future-proofing/validation rather than active correction of many entries.
-            # If specific corrections were needed for other invalid types,
-            # that logic would go here.
-            pass # Assuming types are either Test, Race (for 2025-08-17), or already valid.
-
-
-        modified_plan.append(entry)
-
-    return json.dumps(modified_plan, indent=4)
+from plan_rules import load_rules
+from plan_index import indexed_entries, write_date_index
+from plan_validator import VALID_ACTIVITY_TYPES, PlanWarning, get_validator
+
+_READ_SIZE = 1 << 16
+# An entry still undecodable after this much buffered input is malformed, not
+# cut off at the end of the buffer (entries are a few hundred bytes)
+_MAX_ENTRY_SIZE = 1 << 20
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_ARRAY_SEPARATORS = re.compile(r"[\s,]*")  # Whitespace and the commas between array items
+
+def drop_test_entry(entry, rules):
+    if entry.get("activityType") == "Test":
+        return None  # Skip entries with activityType "Test"
+    return entry
+
+def apply_date_override(entry, rules):
+    rule = rules.match_date(entry.get("date"), entry.get("title"))
+    if rule is not None:
+        rule.apply(entry)
+    return entry
+
+def check_activity_type(entry, rules):
+    # Entries the processed schema doesn't allow (an activityType outside
+    # VALID_ACTIVITY_TYPES, a bad date or weekday) are reported as
+    # PlanWarnings and passed through; the strict-types stage rejects them.
+    for violation in get_validator("processed").check_entry(entry):
+        warnings.warn(f"{violation.date}: {violation.message}", PlanWarning, stacklevel=2)
+    return entry
+
+# The post-processing steps in order. plan_pipeline.py registers them as its
+# built-in stages, so the fused pipeline and this script stay in step.
+MODIFY_STEPS = (drop_test_entry, apply_date_override, check_activity_type)
+
+def modify_entry(entry, rules):
+    # Post-processes one entry in place. Returns it, or None if it is dropped.
+    for step in MODIFY_STEPS:
+        entry = step(entry, rules)
+        if entry is None:
+            return None
+    return entry
+
+def modify_entries(entries, rules=None, stats=None):
+    # Lazily post-processes any iterable of entries, one at a time.
+    # Date-specific rewrites (e.g. the 2025-08-17 race title) come from the
+    # same rule set the parser uses, see training_plan_rules.json.
+    # With a PipelineStats as `stats`, time spent is recorded as "modify".
+    if rules is None:
+        rules = load_rules()
+    modify = modify_entry if stats is None else stats.timed("modify", modify_entry, count=lambda entry: 1)
+    for entry in entries:
+        entry = modify(entry, rules)
+        if entry is not None:
+            yield entry
+
+def modify_training_plan(file_path="training_plan.json", rules=None, stats=None):
+    if stats is None:
+        with open(file_path, 'r') as f:
+            training_plan = json.load(f)
+        return json.dumps(list(modify_entries(training_plan, rules)), indent=4)
+
+    with stats.stage("read") as stage:
+        with open(file_path, 'r') as f:
+            training_plan = json.load(f)
+        stage.entries = len(training_plan)
+
+    modified_plan = list(modify_entries(training_plan, rules, stats))
+
+    with stats.stage("serialize", entries=len(modified_plan)):
+        return json.dumps(modified_plan, indent=4)
+
+def iter_json_entries(stream):
+    # Reads entries one at a time from a JSON array or from JSONL (one object
+    # per line), keeping only a small read buffer in memory. The format is
+    # detected from the first non-whitespace character.
+    buffer = ""
+    pos = 0
+    at_eof = False
+    in_array = None
+    separators = _WHITESPACE
+
+    while True:
+        pos = separators.match(buffer, pos).end()
+        if pos == len(buffer):
+            if at_eof:
+                if in_array:
+                    raise ValueError("Unterminated JSON array")
+                return
+            chunk = stream.read(_READ_SIZE)
+            at_eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        if in_array is None:
+            in_array = buffer[pos] == "["
+            if in_array:
+                separators = _ARRAY_SEPARATORS
+                pos += 1
+            continue
+        if in_array and buffer[pos] == "]":
+            return
+
+        try:
+            entry, end = _JSON_DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Most likely an entry cut off at the end of the buffer; read more,
+            # but not without bound when the input is simply malformed
+            if at_eof or len(buffer) - pos > _MAX_ENTRY_SIZE:
+                raise
+            chunk = stream.read(_READ_SIZE)
+            at_eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield entry
+        pos = end
+
+def write_entries(entries, out, output_format="json"):
+    # Writes each entry as soon as it is available. "json" output is byte for
+    # byte what json.dumps(list_of_entries, indent=4) would produce.
+    # Returns the number of entries written.
+    count = 0
+    if output_format == "jsonl":
+        for entry in entries:
+            out.write(json.dumps(entry))
+            out.write("\n")
+            count += 1
+        return count
+
+    for entry in entries:
+        out.write(",\n    " if count else "[\n    ")
+        out.write(json.dumps(entry, indent=4).replace("\n", "\n    "))
+        count += 1
+    out.write("\n]" if count else "[]")
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post-process a parsed training plan.")
+    parser.add_argument("input", nargs="?", default="training_plan.json",
+                        help="JSON array or JSONL file of entries, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="json: indented array (default), jsonl: one entry per line")
+    parser.add_argument("--index", metavar="PATH", help="Also write a month-bucketed date index of the output")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="PATH",
+                        help="Print time per stage (read, modify, write) to stderr, or write it as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    stats = None
+    if args.profile:
+        from plan_stats import PipelineStats
+        stats = PipelineStats()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r")
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    date_index = {}
+    try:
+        entries = iter_json_entries(source)
+        if stats is not None:
+            entries = stats.timed_iter("read", entries)
+        entries = modify_entries(entries, stats=stats)
+        if args.index:
+            entries = indexed_entries(entries, date_index)
+        if stats is None:
+            write_entries(entries, out, args.format)
+        else:
+            # Charged only for formatting and writing; reading and modifying
+            # happen as write_entries pulls entries and are timed on their own
+            with stats.stage("write") as stage:
+                stage.entries = write_entries(entries, out, args.format)
+        if args.format == "json":
+            out.write("\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    if args.index:
+        write_date_index(date_index, args.index)
+    if stats is not None:
+        from plan_stats import report_profile
+        report_profile(stats, args.profile, sys.stderr)
+    return 0
 
 if __name__ == "__main__":
-    modified_json = modify_training_plan()
-    print(modified_json)
+    sys.exit(main())
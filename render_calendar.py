@@ -0,0 +1,97 @@
+import re
+import sys
+import json
+import argparse
+from calendar import monthrange
+from html import escape
+
+from plan_index import build_date_index
+
+PLAN_PATH = "training_plan.json"
+RACES_PATH = "predefined_races.json"
+PAGE_PATH = "index.html"
+
+# The month tables already in the page; only their <tbody> is rewritten
+MONTH_TABLE = re.compile(
+    r'(<div class="month-container" data-month="(\d+)" data-year="(\d+)">.*?<tbody)[^>]*>(.*?)(</tbody>)',
+    re.DOTALL,
+)
+_ROW_INDENT = "\n" + " " * 20
+_CELL_INDENT = "\n" + " " * 24
+_EMPTY_CELL = '<td class="empty"><div class="date"></div><div class="event-content"></div></td>'
+
+def load_races(path=RACES_PATH):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _capitalize(title):
+    # Same as capitalizeFirstLetter() in the page
+    if not title or title == "-":
+        return title
+    return title[0].upper() + title[1:]
+
+def _render_day(iso, day, workout, race):
+    # Mirrors generateCalendar(): a plan entry takes precedence over a
+    # predefined race on the same day
+    event = workout or race
+    if event is None:
+        classes, title = "empty", "-"
+    else:
+        classes, title = event["activityType"].lower() + " has-event", event["title"]
+    return (f'<td class="{escape(classes)}" data-date="{iso}"><div class="date">{day}</div>'
+            f'<div class="event-content">{escape(_capitalize(title))}</div></td>')
+
+def render_month(year, month, plan, races, date_index=None):
+    # Rows for one month table. `month` is 0-based like the page's data-month.
+    # Sunday-first weeks, only as many rows as the month needs.
+    if date_index is None:
+        date_index = build_date_index(plan)
+    bucket = date_index.get(f"{year}-{month + 1:02d}", {})
+    first_weekday, days_in_month = monthrange(year, month + 1)
+    leading = (first_weekday + 1) % 7
+
+    cells = [_EMPTY_CELL] * leading
+    for day in range(1, days_in_month + 1):
+        iso = f"{year}-{month + 1:02d}-{day:02d}"
+        position = bucket.get(iso)
+        cells.append(_render_day(iso, day, plan[position] if position is not None else None, races.get(iso)))
+    cells += [_EMPTY_CELL] * (-len(cells) % 7)
+
+    rows = []
+    for start in range(0, len(cells), 7):
+        rows.append(_ROW_INDENT + "<tr>" + _CELL_INDENT + _CELL_INDENT.join(cells[start:start + 7])
+                    + _ROW_INDENT + "</tr>")
+    return "".join(rows) + "\n" + " " * 16
+
+def render_calendar(html, plan, races):
+    # Fills every month table in the page. The tbody is tagged data-rendered
+    # so the page only hydrates it instead of building it again.
+    date_index = build_date_index(plan)
+
+    def render(match):
+        year, month = int(match.group(3)), int(match.group(2))
+        return (match.group(1) + ' data-rendered="true">'
+                + render_month(year, month, plan, races, date_index) + match.group(5))
+
+    return MONTH_TABLE.sub(render, html)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render the month tables in index.html.")
+    parser.add_argument("--plan", default=PLAN_PATH, help="Processed plan JSON")
+    parser.add_argument("--races", default=RACES_PATH, help="Predefined races JSON")
+    parser.add_argument("--page", default=PAGE_PATH, help="Page to update")
+    args = parser.parse_args(argv)
+
+    with open(args.plan, "r") as f:
+        plan = json.load(f)
+    races = load_races(args.races)
+    with open(args.page, "r", encoding="utf-8") as f:
+        html = f.read()
+    html = render_calendar(html, plan, races)
+    with open(args.page, "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"Rendered calendar for {len(plan)} entries into {args.page}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
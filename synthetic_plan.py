@@ -0,0 +1,115 @@
+import sys
+import random
+import argparse
+
+from parse_plan import PLAN_HEADER, DAY_OF_WEEK_MAP
+
+# Workout templates per activity: (title, details lines). "{n}" is filled
+# with a duration so titles vary between weeks and athletes.
+WORKOUTS = {
+    "Swim": [
+        ("{n}-Minute Easy Swim", ["Swim easy, taking breaks as needed."]),
+        ("{n}-Minute Build Swim", ["WU- 5 minutes easy swim",
+                                   "MS- 4 x 4 minutes TP (test pace), with 1 minute RI (recovery interval)",
+                                   "CD- 5 minutes easy swim"]),
+    ],
+    "Bike": [
+        ("{n}-Minute Easy Bike", ["Ride easy/ conversational, and use an easy gear with a high cadence."]),
+        ("{n}-Minute Build Ride", ["WU- 12 minutes easy", "MS- 4 x 8 minutes TP (test pace), with 2 minutes RI (recovery",
+                                   "interval).", "CD- 10 minutes easy"]),
+    ],
+    "Run": [
+        ("{n}-Minute Easy Run", ["Run/ walk easy (conversational), taking breaks as needed."]),
+        ("{n}-Minute Build Run", ["WU- 10 minutes easy walk/ jog", "MS- 4 x 5 minutes TP (test pace), with 2 minutes RI",
+                                  "CD- 8 minutes easy walk/ jog"]),
+    ],
+    "Test": [
+        ("30-Minute Swim Test", ["WU- 5 to 10 minutes easy swim", "MS- Swim 15 minutes max distance.",
+                                 "CD- 5 minutes easy swim"]),
+        ("45-Minute Run Test", ["WU- 10 minutes easy walk/ jog", "MS- Run/ walk 30 minutes maximum distance.",
+                                "CD- 5 minutes easy walk"]),
+        ("45-Minute Bike Test", ["WU- Ride 10 minutes easy", "MS- Ride 30 minutes maximum distance",
+                                 "CD- Ride 5 minutes easy"]),
+    ],
+    # Bike sessions with a run tacked on, the shape the Brick rules special-case
+    "Brick": [
+        ("{n}-Minute Build Bike", ["WU- 12 minutes easy", "MS- 4 x 9 minutes TP (test pace), with 2 minutes RI (recovery",
+                                   "interval). Then run 5 minutes gradually building to TP.", "CD- 10 minutes easy"]),
+        ("20-Minute Pre-Race Workout", ["Bike 15 minutes progressing to race pace, then run 5 minutes",
+                                        "progressing to race pace."]),
+    ],
+}
+DAY_OFF_DETAILS = ["Take the day off, including as much time off your feet as possible.",
+                   "Spend some time preparing meals for the week."]
+PREAMBLE = """
+{weeks} Week Synthetic Sprint Triathlon Training Plan
+
+   Generated plan for athlete {athlete}.
+   Published Sep 26, 2018
+
+"""
+
+# Chances of each irregular shape per day (or per week for skipped days)
+STRAY_DOT_RATE = 0.05      # A "." line between days, as in the real week 7
+BARE_DAY_OFF_RATE = 0.5    # "Day Off" with no details under it
+SKIPPED_DAY_RATE = 0.05    # A day left out entirely, filled in as Rest by the parser
+BRICK_RATE = 0.3           # Saturday is a Brick session
+
+def _day_lines(rng, day_idx, week, weeks):
+    if week == weeks and day_idx == 6:
+        return ["RACE DAY", "Arrive early, trust your sprint training plan, have fun!"]
+    if day_idx == 0 or (day_idx in (2, 4) and week % 4 == 0):
+        if rng.random() < BARE_DAY_OFF_RATE:
+            return ["Day Off"]
+        return ["Day Off"] + DAY_OFF_DETAILS
+    if day_idx == 5 and rng.random() < BRICK_RATE:
+        activity = "Brick"
+    elif week % 4 == 1 and day_idx in (1, 3, 5):
+        activity = "Test"
+    else:
+        activity = ("Swim", "Bike", "Run", "Bike", "Swim", "Bike", "Run")[day_idx]
+    title, details = rng.choice(WORKOUTS[activity])
+    return [title.format(n=rng.choice((20, 30, 35, 45, 50, 60, 65)))] + details
+
+def generate_plan(weeks=12, athlete=0, seed=0, irregular=True):
+    # One plan's text in the layout parse_plan.py expects: a preamble, the plan
+    # header, then "Week N" sections of indented day blocks. Deterministic for
+    # a given (weeks, athlete, seed).
+    rng = random.Random(f"{seed}:{athlete}")
+    lines = [PREAMBLE.format(weeks=weeks, athlete=athlete), PLAN_HEADER, ""]
+    for week in range(1, weeks + 1):
+        lines += [f"Week {week}", ""]
+        for day_idx, day_name in enumerate(DAY_OF_WEEK_MAP):
+            if irregular and 0 < day_idx < 6 and rng.random() < SKIPPED_DAY_RATE:
+                continue
+            lines.append(f"   {day_name}")
+            lines += [f"   {line}" for line in _day_lines(rng, day_idx, week, weeks)]
+            lines.append("")
+            if irregular and rng.random() < STRAY_DOT_RATE:
+                lines.append(".")
+    return "\n".join(lines) + "\n"
+
+def generate_corpus(weeks=12, athletes=1, seed=0, irregular=True):
+    # M plans concatenated, the way batch dumps arrive. Every plan header
+    # starts a new plan, so the parser restarts dates for each athlete.
+    return "".join(generate_plan(weeks, athlete, seed, irregular) for athlete in range(athletes))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic training plan text.")
+    parser.add_argument("-w", "--weeks", type=int, default=12)
+    parser.add_argument("-a", "--athletes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--regular", action="store_true", help="Leave out stray lines and skipped days")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout")
+    args = parser.parse_args(argv)
+
+    text = generate_corpus(args.weeks, args.athletes, args.seed, irregular=not args.regular)
+    if args.output == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
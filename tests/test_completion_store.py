@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from completion_store import COMPLETED, CompletionStore
+
+PLAN = [
+    {"week": 1, "date": "2025-06-02", "activityType": "Run", "title": "20-Minute Easy Run"},
+    {"week": 1, "date": "2025-06-03", "activityType": "Swim", "title": "20-Minute Easy Swim"},
+    {"week": 1, "date": "2025-06-04", "activityType": "Run", "title": "30-Minute Build Run"},
+    {"week": 1, "date": "2025-06-05", "activityType": "Rest", "title": "Day Off"},
+]
+
+@pytest.fixture
+def store(tmp_path):
+    with CompletionStore(str(tmp_path / "completions.db")) as store:
+        store.load_plan("sprint", PLAN)
+        for athlete in ("ann", "bob"):
+            store.assign_plan(athlete, "sprint")
+        store.upsert([("ann", "2025-06-02", COMPLETED), ("ann", "2025-06-03", COMPLETED),
+                      ("bob", "2025-06-04", COMPLETED), ("bob", "2025-06-09", COMPLETED)])
+        yield store
+
+def _query_plans(store, **filters):
+    # EXPLAIN QUERY PLAN details of the statement query() runs
+    statements = []
+    store.conn.set_trace_callback(statements.append)
+    try:
+        store.query(**filters)
+    finally:
+        store.conn.set_trace_callback(None)
+    select = next(sql for sql in statements if sql.startswith("SELECT"))
+    return [row[3] for row in store.conn.execute("EXPLAIN QUERY PLAN " + select)]
+
+def test_query_by_type_across_athletes(store):
+    rows = store.query(activity_type="Run")
+    assert [(row["athlete"], row["date"], row["title"]) for row in rows] == [
+        ("ann", "2025-06-02", "20-Minute Easy Run"),
+        ("bob", "2025-06-04", "30-Minute Build Run"),
+    ]
+    assert [row["date"] for row in store.query(activity_type="Run", start="2025-06-03")] == ["2025-06-04"]
+
+def test_query_keeps_completions_outside_the_plan(store):
+    rows = store.query(athlete="bob")
+    assert [(row["date"], row["activityType"]) for row in rows] == [("2025-06-04", "Run"), ("2025-06-09", None)]
+
+@pytest.mark.parametrize("filters", [
+    {"activity_type": "Run"},
+    {"activity_type": "Run", "start": "2025-06-01", "end": "2025-06-30"},
+    {"athlete": "ann", "activity_type": "Run"},
+    {"athlete": "ann"},
+    {"start": "2025-06-01", "end": "2025-06-30"},
+])
+def test_filtered_queries_do_not_scan(store, filters):
+    plans = _query_plans(store, **filters)
+    assert not [detail for detail in plans if detail.startswith("SCAN")], plans
+
+class _BusyCommit:
+    # Wraps the store's connection so its next COMMIT fails busy without
+    # ending the transaction, as a COMMIT waiting on readers can
+    def __init__(self, conn):
+        self.conn = conn
+        self.failures = 1
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT" and self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+def test_write_retries_after_a_failed_commit(store):
+    conn = store.conn
+    store.conn = _BusyCommit(conn)
+    try:
+        store.upsert([("ann", "2025-06-04", COMPLETED)])
+    finally:
+        store.conn = conn
+    assert not conn.in_transaction
+    assert [row["date"] for row in store.query(athlete="ann")] == ["2025-06-02", "2025-06-03", "2025-06-04"]
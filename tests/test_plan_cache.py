@@ -0,0 +1,18 @@
+import json
+
+from plan_cache import PlanCache
+
+WEEK = [{"week": 1, "dayOfWeek": "Monday", "date": "2025-05-26", "activityType": "Rest",
+         "title": "Day Off", "details": ""}]
+
+def test_overwriting_a_key_keeps_the_byte_count(tmp_path):
+    size = len(json.dumps(WEEK, separators=(",", ":")))
+    cache = PlanCache(str(tmp_path), max_bytes=size * 3)
+    cache.put("other", WEEK)
+    for _ in range(20):
+        cache.put("week", WEEK)
+    stats = cache.stats()
+    assert stats["bytes"] == 2 * size
+    assert stats["evictions"] == 0
+    assert cache.evict() == 2 * size
+    assert PlanCache(cache.directory).get("other") == WEEK
@@ -0,0 +1,30 @@
+import os
+import json
+
+import pytest
+
+from plan_diff import apply_delta, make_delta
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _entry(day, title):
+    return {"week": 1, "dayOfWeek": "Sunday", "date": day, "activityType": "Run", "title": title, "details": ""}
+
+def test_round_trip():
+    with open(os.path.join(REPO, "training_plan.json"), "r") as f:
+        old = json.load(f)
+    new = [dict(entry) for entry in old[1:]]
+    new[4]["title"] = "Changed"
+    new.append(_entry("2025-08-18", "Recovery Run"))
+    assert apply_delta(old, make_delta(old, new)) == new
+
+def test_delta_against_another_plan_does_not_hang():
+    plan = [_entry("2025-06-01", "X"), _entry("2025-06-01", "Y")]
+    delta = {"version": 1, "base": "", "target": "", "removed": ["2025-06-01"], "added": [], "changed": []}
+    with pytest.raises(ValueError, match="gap before 2025-06-01#1"):
+        apply_delta(plan, delta, verify=False)
+
+def test_removing_a_first_occurrence_shifts_the_rest():
+    old = [_entry("2025-06-01", "X"), _entry("2025-06-01", "Y")]
+    new = [old[1]]
+    assert apply_delta(old, make_delta(old, new)) == new
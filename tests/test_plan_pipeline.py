@@ -0,0 +1,25 @@
+import json
+
+from plan_pipeline import main
+from synthetic_plan import generate_plan
+
+def _plan_text(tmp_path):
+    path = tmp_path / "plan.txt"
+    path.write_text(generate_plan(weeks=2, athlete=0))
+    return str(path)
+
+def test_stage_error_is_reported_and_output_left_alone(tmp_path, capsys):
+    output = tmp_path / "training_plan.json"
+    output.write_text("old")
+    # The synthetic plan has Test entries, which strict-types rejects
+    assert main([_plan_text(tmp_path), "-o", str(output), "--stage", "strict-types"]) == 1
+    assert "invalid activityType 'Test'" in capsys.readouterr().err
+    assert output.read_text() == "old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["plan.txt", "training_plan.json"]
+
+def test_output_is_replaced_on_success(tmp_path):
+    output = tmp_path / "training_plan.json"
+    output.write_text("old")
+    assert main([_plan_text(tmp_path), "-o", str(output), "--stage", "drop-tests"]) == 0
+    plan = json.loads(output.read_text())
+    assert plan and all(entry["activityType"] != "Test" for entry in plan)
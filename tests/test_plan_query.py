@@ -0,0 +1,36 @@
+import os
+import json
+
+from plan_query import PlanQuery, filter_sets, main
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _load(name):
+    with open(os.path.join(REPO, name), "r") as f:
+        return json.load(f)
+
+def test_race_day_filter_selects_race_cells():
+    # The plan's race, plus predefined races on days the plan leaves free;
+    # 2025-06-14 has a plan workout, which the calendar shows instead
+    sets = filter_sets(_load("training_plan.json"), _load("predefined_races.json"))
+    assert sets["race-day"] == ["2025-05-11", "2025-08-17", "2025-10-19"]
+
+def test_brick_filter_covers_cross():
+    plan = [{"week": 1, "date": "2025-06-01", "activityType": "Brick", "title": "Brick"},
+            {"week": 1, "date": "2025-06-02", "activityType": "Cross", "title": "Cross"},
+            {"week": 1, "date": "2025-06-03", "activityType": "Run", "title": "Run"}]
+    assert filter_sets(plan)["brick"] == ["2025-06-01", "2025-06-02"]
+
+def test_query_terms():
+    query = PlanQuery(_load("training_plan.json"))
+    mask = query.query("type:Bike,Brick week:5-8 -after:2025-07-06")
+    entries = query.select(mask)
+    assert entries and all(entry["activityType"] in ("Bike", "Brick") and 5 <= entry["week"] <= 8
+                           and entry["date"] <= "2025-07-06" for entry in entries)
+    assert query.count(mask) == len(entries)
+
+def test_filter_sets_cli_includes_predefined_races(capsys):
+    plan = os.path.join(REPO, "training_plan.json")
+    races = os.path.join(REPO, "predefined_races.json")
+    assert main(["--plan", plan, "--races", races, "--filter-sets"]) == 0
+    assert json.loads(capsys.readouterr().out) == filter_sets(_load("training_plan.json"), _load("predefined_races.json"))
@@ -0,0 +1,63 @@
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from parse_plan import training_plan_text
+from plan_service import MAX_BODY_BYTES, PlanService
+
+def _exchange(request):
+    # Sends raw request bytes to a PlanService on an ephemeral port and
+    # returns (status, body as JSON)
+    async def run():
+        service = PlanService(executor=ThreadPoolExecutor(max_workers=1))
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout=10)
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+    return asyncio.run(run())
+
+def _post(body, length):
+    return (f"POST /compile HTTP/1.1\r\nHost: localhost\r\nContent-Length: {length}\r\n\r\n".encode("ascii")
+            + body)
+
+@pytest.mark.parametrize("length", ["-1", "+5", "1_0", "abc"])
+def test_bad_content_length_is_rejected(length):
+    status, body = _exchange(_post(b"{}", length))
+    assert status == 400
+    assert body == {"error": "Bad Content-Length"}
+
+def test_oversized_body_is_rejected_before_reading():
+    # Nothing past the headers is sent; the 413 must not wait for the body
+    status, body = _exchange(_post(b"", MAX_BODY_BYTES + 1))
+    assert status == 413
+    assert "limited" in body["error"]
+
+def test_compile():
+    body = json.dumps({"text": training_plan_text, "startDate": "2025-05-26"}).encode("utf-8")
+    status, plan = _exchange(_post(body, len(body)))
+    assert status == 200
+    with open(os.path.join(os.path.dirname(__file__), "..", "training_plan.json"), "r") as f:
+        assert plan == json.load(f)
+
+@pytest.mark.parametrize("request_bytes", [
+    b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n",
+    b"GET /health HTTP/1.1\r\nX-Padding: " + b"a" * 70000 + b"\r\n\r\n",
+])
+def test_overlong_line_is_rejected(request_bytes):
+    # Lines past the StreamReader's 64 KiB limit
+    status, body = _exchange(request_bytes)
+    assert status == 431
+    assert "too long" in body["error"]
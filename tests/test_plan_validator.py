@@ -0,0 +1,43 @@
+import os
+import json
+
+import pytest
+
+import plan_validator
+from plan_validator import DATE_CACHE_SIZE, PlanWarning, validate_plan
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _processed_plan():
+    with open(os.path.join(REPO, "training_plan.json"), "r") as f:
+        return json.load(f)
+
+def test_processed_plan_is_valid():
+    assert validate_plan(_processed_plan(), "processed") == []
+
+def test_unknown_activity_type_is_reported():
+    plan = _processed_plan()
+    plan[3] = dict(plan[3], activityType="Unknown")
+    violations = validate_plan(plan, "processed")
+    assert [(v.position, v.rule) for v in violations] == [(3, "activityType")]
+
+def test_date_cache_is_bounded():
+    plan_validator._date_ordinal.cache_clear()
+    plan = _processed_plan()
+    for year in range(2000, 2000 + DATE_CACHE_SIZE // len(plan) + 2):
+        validate_plan([dict(entry, date=str(year) + entry["date"][4:]) for entry in plan], "processed")
+    assert plan_validator._date_ordinal.cache_info().currsize == DATE_CACHE_SIZE
+
+def test_default_stages_report_unknown_types_without_dropping_them():
+    from plan_pipeline import PlanPipeline
+    plan = _processed_plan()
+    plan[3] = dict(plan[3], activityType="Unknown")
+    with pytest.warns(PlanWarning, match=f"{plan[3]['date']}: activityType 'Unknown' is not allowed"):
+        assert list(PlanPipeline().transform(dict(entry) for entry in plan)) == plan
+
+def test_strict_types_rejects_unknown_types():
+    from plan_pipeline import PlanPipeline
+    plan = _processed_plan()
+    plan[3] = dict(plan[3], activityType="Unknown")
+    with pytest.raises(ValueError, match="invalid activityType"):
+        list(PlanPipeline(stages=("strict-types",)).transform(plan))
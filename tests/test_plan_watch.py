@@ -0,0 +1,86 @@
+import os
+import json
+import shutil
+
+import pytest
+
+import plan_watch
+from plan_watch import PlanWatcher
+from render_calendar import MONTH_TABLE, load_races
+from synthetic_plan import generate_plan
+from update_page import PLAN_BLOCK_ID, RACES_BLOCK_ID, block_pattern, read_plan_block, render_page
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def workdir(tmp_path):
+    for name in ("index.html", "training_plan_rules.json", "predefined_races.json"):
+        shutil.copy(os.path.join(REPO, name), tmp_path / name)
+    (tmp_path / "plan.txt").write_text(generate_plan(weeks=12))
+    return tmp_path
+
+def _watcher(workdir):
+    return PlanWatcher(str(workdir / "plan.txt"), str(workdir / "training_plan_rules.json"),
+                       str(workdir / "predefined_races.json"), str(workdir / "index.html"),
+                       str(workdir / "training_plan.json"), log=None)
+
+def _drop_month_table(path, year, month):
+    # Removes the month-container for (year, 0-based month) from the page
+    html = path.read_text()
+    for match in MONTH_TABLE.finditer(html):
+        if (int(match.group(3)), int(match.group(2))) == (year, month):
+            end = html.index("</div>", html.index("</table>", match.end())) + len("</div>")
+            path.write_text(html[:match.start()] + html[end:])
+            return
+    raise AssertionError(f"No table for {year}-{month + 1}")
+
+def _page_plan(path):
+    return read_plan_block(block_pattern(PLAN_BLOCK_ID).search(path.read_text()).group(2))
+
+def test_edit_within_the_page_months_is_patched(workdir):
+    watcher = _watcher(workdir)
+    watcher.sync()
+    (workdir / "plan.txt").write_text(generate_plan(weeks=16))  # Runs into September
+    result = watcher.sync(["source"])
+    assert "2025-09" in result and not result.startswith("re-rendered")
+    page = (workdir / "index.html").read_text()
+    assert 'data-date="2025-09-14"' in page
+    assert page == render_page(page, watcher.plan, load_races(str(workdir / "predefined_races.json")))
+
+def test_edit_into_a_month_without_a_table_re_renders(workdir):
+    _drop_month_table(workdir / "index.html", 2025, 8)
+    watcher = _watcher(workdir)
+    watcher.sync()
+    (workdir / "plan.txt").write_text(generate_plan(weeks=16))
+    result = watcher.sync(["source"])
+    assert result.startswith("re-rendered")
+    assert result.endswith("no month table for 2025-09")
+    assert _page_plan(workdir / "index.html") == watcher.plan
+    with open(workdir / "training_plan.json", "r") as f:
+        assert json.load(f) == watcher.plan
+
+def test_page_without_a_block_re_renders(workdir):
+    page = workdir / "index.html"
+    page.write_text(block_pattern(RACES_BLOCK_ID).sub("", page.read_text(), count=1))
+    result = _watcher(workdir).sync()
+    assert result.startswith("re-rendered")
+    races = load_races(str(workdir / "predefined_races.json"))
+    html = page.read_text()
+    assert json.loads(block_pattern(RACES_BLOCK_ID).search(html).group(2)) == races
+
+def test_failed_write_keeps_the_old_state(workdir, monkeypatch):
+    watcher = _watcher(workdir)
+    watcher.sync()
+    old_plan = watcher.plan
+    (workdir / "plan.txt").write_text(generate_plan(weeks=16))
+
+    def fail(self, replacements):
+        raise OSError("disk full")
+    with monkeypatch.context() as patched:
+        patched.setattr(plan_watch.PagePatcher, "patch", fail)
+        with pytest.raises(OSError):
+            watcher.sync(["source"])
+    assert watcher.plan is old_plan
+    # The next sync still sees the edit and finishes it
+    assert "2025-09" in watcher.sync(["source"])
+    assert _page_plan(workdir / "index.html") == watcher.plan != old_plan
@@ -0,0 +1,25 @@
+import io
+import json
+
+import pytest
+
+from process_training_plan import iter_json_entries
+
+class EndlessGarbage(io.TextIOBase):
+    # A malformed entry followed by input that never ends
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return '[{"date": 1 x ' if self.reads == 1 else " " * size
+
+def test_entries_split_across_reads():
+    plan = [{"date": "2025-06-02", "details": "x" * 100000}, {"date": "2025-06-03", "details": ""}]
+    assert list(iter_json_entries(io.StringIO(json.dumps(plan, indent=4)))) == plan
+
+def test_malformed_entry_fails_without_reading_everything():
+    stream = EndlessGarbage()
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_entries(stream))
+    assert stream.reads < 100
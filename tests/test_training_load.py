@@ -0,0 +1,35 @@
+import pytest
+
+import training_load
+from plan_pipeline import PlanPipeline
+from synthetic_plan import generate_plan
+from training_load import ACUTE_DAYS, CHRONIC_DAYS, batch_ewma, batch_load_series, ewma, load_series, taper_report
+
+@pytest.fixture(autouse=True)
+def empty_series_cache():
+    training_load._series_cache.clear()
+    yield
+    training_load._series_cache.clear()
+
+def test_batch_ewma_matches_scalar_path():
+    series = [[0.0, 60.0, 45.0], [80.0] * 10, [], [30.0, 0.0, 0.0, 90.0, 20.0]]
+    for time_constant in (ACUTE_DAYS, CHRONIC_DAYS):
+        assert batch_ewma(series, time_constant) == [ewma(loads, time_constant) for loads in series]
+
+def test_batch_load_series_matches_per_plan_path():
+    # Plans of different lengths, so the batch pads and trims series
+    plans = [PlanPipeline().compile(generate_plan(weeks=weeks, athlete=athlete))
+             for weeks, athlete in ((12, 0), (12, 1), (8, 2), (16, 3))]
+    batched = batch_load_series(plans)
+    training_load._series_cache.clear()
+    assert batched == [load_series(plan) for plan in plans]
+    for series in batched:
+        for sport in series["sports"].values():
+            assert sport["atl"] == ewma(sport["load"], ACUTE_DAYS)
+            assert sport["ctl"] == ewma(sport["load"], CHRONIC_DAYS)
+
+def test_empty_plan_has_empty_series_and_no_race():
+    series = load_series([])
+    assert series == {"dates": [], "load": [], "atl": [], "ctl": [], "tsb": [], "sports": {}}
+    assert batch_load_series([[]]) == [series]
+    assert taper_report([]) == {"raceDate": None, "ok": False, "issues": ["plan has no Race entry"]}
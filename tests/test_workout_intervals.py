@@ -0,0 +1,38 @@
+import json
+
+from workout_intervals import OTHER, aggregate_volume, main, workout_minutes
+
+SPORTLESS_BRICK = {
+    "week": 1,
+    "dayOfWeek": "Saturday",
+    "date": "2025-05-31",
+    "activityType": "Brick",
+    "title": "20-Min Pre-Race Brick",
+    "details": "WU- 12 minutes easy\nMS- 4 x 8 minutes TP (test pace), with 2 minutes RI (recovery\n"
+               "interval).\nCD- 10 minutes easy",
+}
+EASY_BIKE = {
+    "week": 1,
+    "dayOfWeek": "Sunday",
+    "date": "2025-06-01",
+    "activityType": "Bike",
+    "title": "30-Minute Easy Bike",
+    "details": "Ride easy/ conversational, and use an easy gear with a high cadence.",
+}
+
+def test_sportless_brick_goes_to_other():
+    profile = dict(workout_minutes(SPORTLESS_BRICK["activityType"], SPORTLESS_BRICK["title"],
+                                   SPORTLESS_BRICK["details"]))
+    assert {sport for sport, _ in profile} == {OTHER}
+    assert sum(profile.values()) == 60.0
+
+def test_aggregate_volume_with_sportless_brick():
+    volume = aggregate_volume([[SPORTLESS_BRICK, EASY_BIKE]])
+    assert volume[1]["sports"] == {OTHER: 60.0, "Bike": 30.0}
+    assert volume[1]["minutes"] == 90.0
+
+def test_main_prints_sportless_brick(tmp_path, capsys):
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps([SPORTLESS_BRICK, EASY_BIKE]))
+    assert main([str(path)]) == 0
+    assert "Bike 30, Other 60" in capsys.readouterr().out
@@ -0,0 +1,216 @@
+import sys
+import json
+import math
+import argparse
+from itertools import accumulate
+from operator import add, mul
+
+from parse_plan import date_ordinal, iso_date
+from workout_intervals import UNSPECIFIED, workout_minutes
+
+# Load points per hour by intensity, on the usual scale where an hour at
+# threshold is 100
+LOAD_PER_HOUR = {"easy": 45.0, "TP": 80.0, "race pace": 95.0, "max": 110.0, UNSPECIFIED: 60.0}
+# The race entry has no duration; a sprint triathlon takes about this long
+RACE_MINUTES = 75
+RACE_SPLIT = {"Swim": 0.15, "Bike": 0.5, "Run": 0.35}
+
+ACUTE_DAYS = 7     # ATL time constant: fatigue
+CHRONIC_DAYS = 42  # CTL time constant: fitness
+# Taper checks, over the days before the race against the weeks before those
+TAPER_DAYS = 7
+TAPER_BASELINE_DAYS = 21
+TAPER_MAX_RATIO = 0.7
+
+SERIES_CACHE_SIZE = 4096
+_series_cache = {}
+
+def entry_load(entry):
+    # {sport: load points} for one plan entry
+    if entry["activityType"] == "Race":
+        load = RACE_MINUTES / 60 * LOAD_PER_HOUR["race pace"]
+        return {sport: load * share for sport, share in RACE_SPLIT.items()}
+    loads = {}
+    for (sport, intensity), minutes in workout_minutes(entry["activityType"], entry["title"], entry["details"]):
+        loads[sport] = loads.get(sport, 0.0) + minutes / 60 * LOAD_PER_HOUR[intensity]
+    return loads
+
+def daily_loads(plan):
+    # (first date's ordinal, {sport: [load per day]}) covering every day from
+    # the plan's first date to its last; days without entries (rest days, or
+    # tests dropped by post-processing) are 0. An empty plan has no days.
+    if not plan:
+        return None, {}
+    ordinals = [date_ordinal(entry["date"]) for entry in plan]
+    start = min(ordinals)
+    days = max(ordinals) - start + 1
+    sports = {}
+    for ordinal, entry in zip(ordinals, plan):
+        for sport, load in entry_load(entry).items():
+            series = sports.get(sport)
+            if series is None:
+                series = sports[sport] = [0.0] * days
+            series[ordinal - start] += load
+    return start, sports
+
+def _weights(time_constant):
+    # (decay, alpha) for the recursive form of an exponential kernel:
+    # level = level * decay + load * alpha, with alpha = 1 - e^(-1/tc)
+    alpha = 1 - math.exp(-1 / time_constant)
+    return 1 - alpha, alpha
+
+def ewma(loads, time_constant, seed=0.0):
+    # The load series convolved with an exponential kernel of the given time
+    # constant. The kernel's recursive form gives the same result in one step
+    # per day.
+    decay, alpha = _weights(time_constant)
+    return list(accumulate(loads, lambda level, load: level * decay + load * alpha, initial=seed))[1:]
+
+def batch_ewma(series, time_constant):
+    # ewma() of many series at once: one step per day advances every series'
+    # level together, the levels kept in one flat list and the arithmetic
+    # done by map() over operator functions rather than a Python call per
+    # series per day. Shorter series are padded with zero load and cut back
+    # to their length afterwards; the results equal ewma()'s exactly.
+    decay, alpha = _weights(time_constant)
+    width = max(map(len, series), default=0)
+    columns = zip(*(tuple(loads) + (0.0,) * (width - len(loads)) for loads in series))
+    decays, alphas = [decay] * len(series), [alpha] * len(series)
+    levels = [0.0] * len(series)
+    days = []
+    for column in columns:
+        levels = list(map(add, map(mul, levels, decays), map(mul, column, alphas)))
+        days.append(levels)
+    return [list(values[:len(loads)]) for values, loads in zip(zip(*days), series)]
+
+def _filtered_many(series):
+    # {load series as a tuple: (ATL, CTL)} for every distinct series given,
+    # from the cache where possible and batched otherwise: plans built from
+    # the same template (or athletes on the same plan) share their series
+    result, pending = {}, []
+    for loads in series:
+        key = tuple(loads)
+        if key in result:
+            continue
+        cached = _series_cache.get(key)
+        if cached is None:
+            pending.append(key)
+            result[key] = None
+        else:
+            result[key] = cached
+    if pending:
+        for key, atl, ctl in zip(pending, batch_ewma(pending, ACUTE_DAYS), batch_ewma(pending, CHRONIC_DAYS)):
+            result[key] = (atl, ctl)
+        if len(_series_cache) + len(pending) > SERIES_CACHE_SIZE:
+            _series_cache.clear()
+        for key in pending[:SERIES_CACHE_SIZE]:
+            _series_cache[key] = result[key]
+    return result
+
+def load_series(plan):
+    # Daily load, ATL (fatigue), CTL (fitness) and TSB (form, yesterday's
+    # CTL - ATL) for a plan, in total and per sport. The filters are linear,
+    # so the totals are the sums of the per-sport series.
+    # Returned lists may be shared between plans with the same loads; don't modify them.
+    start, sports = daily_loads(plan)
+    return _assemble(start, sports, _filtered_many(sports.values()))
+
+def _assemble(start, sports, filtered):
+    days = len(next(iter(sports.values()))) if sports else 0
+    per_sport = {}
+    for sport, loads in sorted(sports.items()):
+        atl, ctl = filtered[tuple(loads)]
+        per_sport[sport] = {"load": loads, "atl": atl, "ctl": ctl}
+    load = [sum(values) for values in zip(*(s["load"] for s in per_sport.values()))] or [0.0] * days
+    atl = [sum(values) for values in zip(*(s["atl"] for s in per_sport.values()))] or [0.0] * days
+    ctl = [sum(values) for values in zip(*(s["ctl"] for s in per_sport.values()))] or [0.0] * days
+    tsb = ([0.0] + [fitness - fatigue for fitness, fatigue in zip(ctl, atl)])[:days]
+    return {
+        "dates": [iso_date(start + day) for day in range(days)],
+        "load": load,
+        "atl": atl,
+        "ctl": ctl,
+        "tsb": tsb,
+        "sports": per_sport,
+    }
+
+def batch_load_series(plans):
+    # load_series for many plans, with every plan's distinct per-sport load
+    # series filtered together in one pass over the days (batch_ewma)
+    daily = [daily_loads(plan) for plan in plans]
+    filtered = _filtered_many([loads for _, sports in daily for loads in sports.values()])
+    return [_assemble(start, sports, filtered) for start, sports in daily]
+
+def taper_report(plan, series=None):
+    # Whether load tapers into the Race entry: the last TAPER_DAYS before it
+    # should average at most TAPER_MAX_RATIO of the TAPER_BASELINE_DAYS
+    # before those, fatigue should be falling and form positive on race day.
+    if series is None:
+        series = load_series(plan)
+    races = [entry["date"] for entry in plan if entry["activityType"] == "Race"]
+    if not races:
+        return {"raceDate": None, "ok": False, "issues": ["plan has no Race entry"]}
+    race = series["dates"].index(races[-1])
+    load, atl, tsb = series["load"], series["atl"], series["tsb"]
+    taper = load[max(0, race - TAPER_DAYS):race]
+    baseline = load[max(0, race - TAPER_DAYS - TAPER_BASELINE_DAYS):max(0, race - TAPER_DAYS)]
+    taper_mean = sum(taper) / len(taper) if taper else 0.0
+    baseline_mean = sum(baseline) / len(baseline) if baseline else 0.0
+    ratio = taper_mean / baseline_mean if baseline_mean else None
+    atl_change = atl[race - 1] - atl[max(0, race - TAPER_DAYS)] if race else 0.0
+
+    issues = []
+    if ratio is None:
+        issues.append("no training before the taper to compare against")
+    elif ratio > TAPER_MAX_RATIO:
+        issues.append(f"taper load is {ratio:.0%} of the preceding weeks (at most {TAPER_MAX_RATIO:.0%} expected)")
+    if atl_change >= 0:
+        issues.append("fatigue (ATL) is not falling into race day")
+    if tsb[race] <= 0:
+        issues.append(f"form (TSB) on race day is {tsb[race]:.1f}, not positive")
+    return {
+        "raceDate": races[-1],
+        "taperLoadRatio": None if ratio is None else round(ratio, 3),
+        "atlChange": round(atl_change, 2),
+        "tsbOnRaceDay": round(tsb[race], 2),
+        "ctlOnRaceDay": round(series["ctl"][race], 2),
+        "ok": not issues,
+        "issues": issues,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Training load (ATL/CTL/TSB) for plan JSON files.")
+    parser.add_argument("plans", nargs="*", default=["training_plan.json"], help="Plan JSON files")
+    parser.add_argument("--json", action="store_true", help="Print the full daily series as JSON")
+    args = parser.parse_args(argv)
+
+    plans = []
+    for path in args.plans:
+        with open(path, "r") as f:
+            plans.append(json.load(f))
+    all_series = batch_load_series(plans)
+    if args.json:
+        print(json.dumps([dict(series, taper=taper_report(plan, series))
+                          for plan, series in zip(plans, all_series)], indent=4))
+        return 0
+
+    for path, plan, series in zip(args.plans, plans, all_series):
+        print(f"{path}:")
+        print(f"  {'week ending':<11} {'load':>6} {'ATL':>6} {'CTL':>6} {'TSB':>6}  by sport")
+        for end in range(6, len(series["dates"]), 7):
+            week_load = sum(series["load"][end - 6:end + 1])
+            sports = ", ".join(f"{sport} {sum(s['load'][end - 6:end + 1]):.0f}"
+                               for sport, s in series["sports"].items())
+            print(f"  {series['dates'][end]:<11} {week_load:>6.0f} {series['atl'][end]:>6.1f} "
+                  f"{series['ctl'][end]:>6.1f} {series['tsb'][end]:>6.1f}  {sports}")
+        taper = taper_report(plan, series)
+        if taper["raceDate"]:
+            verdict = "OK" if taper["ok"] else "; ".join(taper["issues"])
+            print(f"  Race {taper['raceDate']}: TSB {taper['tsbOnRaceDay']}, "
+                  f"taper load {taper['taperLoadRatio']} of baseline -> {verdict}")
+        else:
+            print("  No Race entry")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import re
+import sys
+import json
+import argparse
+
+from plan_index import build_date_index
+from plan_query import filter_sets
+from plan_payload import encode_plan, decode_plan
+from render_calendar import RACES_PATH, load_races, render_calendar
+
+PAGE_PATH = "index.html"
+PLAN_PATH = "training_plan.json"
+PLAN_BLOCK_ID = "trainingPlanData"
+INDEX_BLOCK_ID = "trainingPlanIndex"
+RACES_BLOCK_ID = "predefinedRacesData"
+FILTERS_BLOCK_ID = "trainingPlanFilters"
+
+def block_pattern(block_id):
+    return re.compile(
+        r'(<script type="application/json" id="' + re.escape(block_id) + r'">)(.*?)(</script>)',
+        re.DOTALL,
+    )
+
+def embed_json(data, indent=4):
+    # Block body as it sits in the page. "</" is escaped so a string in the
+    # plan can never close the <script> element early.
+    text = json.dumps(data, indent=indent, separators=None if indent else (",", ":"))
+    return "\n" + text.replace("</", "<\\/") + "\n    "
+
+def replace_json_block(html, block_id, body, insert_after=None):
+    # Swaps the body of an embedded JSON block. A missing block is added right
+    # after the block named by insert_after.
+    pattern = block_pattern(block_id)
+    match = pattern.search(html)
+    if match is not None:
+        return html[:match.start(2)] + body + html[match.end(2):]
+    if insert_after is None:
+        raise ValueError(f"No <script> block with id {block_id!r} in the page")
+    anchor = block_pattern(insert_after).search(html)
+    if anchor is None:
+        raise ValueError(f"No <script> block with id {insert_after!r} in the page")
+    block = f'\n\n    <script type="application/json" id="{block_id}">{body}</script>'
+    return html[:anchor.end()] + block + html[anchor.end():]
+
+def plan_block(plan):
+    # The plan block holds the compact payload (see plan_payload.py), which
+    # the page decodes once in getTrainingPlan()
+    return embed_json(encode_plan(plan), indent=None)
+
+def read_plan_block(body):
+    # Entries from a plan block body; pages from before the payload hold a plain array
+    data = json.loads(body)
+    return data if isinstance(data, list) else decode_plan(data)
+
+def render_page(html, plan, races):
+    html = replace_json_block(html, PLAN_BLOCK_ID, plan_block(plan))
+    html = replace_json_block(html, INDEX_BLOCK_ID, embed_json(build_date_index(plan), indent=None),
+                              insert_after=PLAN_BLOCK_ID)
+    html = replace_json_block(html, RACES_BLOCK_ID, embed_json(races), insert_after=INDEX_BLOCK_ID)
+    html = replace_json_block(html, FILTERS_BLOCK_ID, embed_json(filter_sets(plan, races), indent=None),
+                              insert_after=RACES_BLOCK_ID)
+    return render_calendar(html, plan, races)
+
+def update_page(plan, page_path=PAGE_PATH, races=None):
+    if races is None:
+        races = load_races()
+    with open(page_path, "r", encoding="utf-8") as f:
+        html = f.read()
+    html = render_page(html, plan, races)
+    with open(page_path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed the processed plan in index.html and pre-render its calendar.")
+    parser.add_argument("--plan", default=PLAN_PATH, help="Processed plan JSON")
+    parser.add_argument("--races", default=RACES_PATH, help="Predefined races JSON")
+    parser.add_argument("--page", default=PAGE_PATH, help="Page to update")
+    args = parser.parse_args(argv)
+
+    with open(args.plan, "r") as f:
+        plan = json.load(f)
+    update_page(plan, args.page, load_races(args.races))
+    print(f"Embedded {len(plan)} entries in {args.page}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import re
+import sys
+import json
+import argparse
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+from plan_table import PlanTable
+
+SPORTS = ("Swim", "Bike", "Run")
+# Intensity tags, in the order they are looked for in a segment's text
+INTENSITIES = ("race pace", "TP", "max", "easy")
+UNSPECIFIED = "unspecified"
+OTHER = "Other"  # Sport of workouts whose sport can't be told from the entry
+PARSE_CACHE_SIZE = 4096
+
+# Phase markers: "WU- 10 minutes easy", "MS: Swim 75% ...", "CD- 5 minutes easy swim"
+_PHASE = re.compile(r"\b(WU|MS|CD)\s*[-:]\s*")
+# Brick transitions start a new segment: "..., then run 5 minutes" / "... Then run 8 minutes"
+_THEN = re.compile(r"(?:,|\.)\s*[Tt]hen\s+")
+_RECOVERY = re.compile(r"with\s+(\d+|:\d+)\s*(minutes?|mins?|sec(?:onds)?)\s+RI\b")
+_DURATION = re.compile(
+    r"(?:(\d+)\s*x\s*)?(\d+|:\d+)(?:\s*to\s*(\d+))?\s*-?\s*(minutes?|mins?|min\b|sec(?:onds)?|hours?)\b", re.I)
+_PERCENT = re.compile(r"(\d+)%\s+of\s+goal\s+race\s+distance")
+_TITLE_MINUTES = re.compile(r"^(\d+)-Min(?:ute)?\b")
+_INTENSITY = tuple((tag, re.compile(pattern, re.I)) for tag, pattern in (
+    ("race pace", r"race pace"),
+    ("TP", r"\bTP\b|test pace"),
+    ("max", r"\bmax"),
+    ("easy", r"\beasy|conversational"),
+))
+_SPORT = re.compile(r"\b(swim|bike|ride|spin|run|walk|jog)", re.I)
+_SPORT_OF_WORD = {"swim": "Swim", "bike": "Bike", "ride": "Bike", "spin": "Bike",
+                  "run": "Run", "walk": "Run", "jog": "Run"}
+
+# One piece of a workout. `minutes` is per repeat (None for distance-based
+# work like "75% of goal race distance"), recovery_minutes is the RI after
+# each repeat but the last, and sport/intensity are None when the text
+# doesn't say.
+Segment = namedtuple("Segment", "phase sport repeats minutes recovery_minutes intensity distance_percent")
+Workout = namedtuple("Workout", "title_minutes segments")
+
+def _to_minutes(value, unit):
+    amount = float(value[1:]) if value.startswith(":") else float(value)
+    unit = unit.lower()
+    if unit.startswith("sec") or value.startswith(":"):
+        return amount / 60
+    if unit.startswith("hour"):
+        return amount * 60
+    return amount
+
+def segment_minutes(segment):
+    # Work plus recovery time, or 0 if the segment has no duration
+    if segment.minutes is None:
+        return 0.0
+    return segment.repeats * segment.minutes + (segment.repeats - 1) * segment.recovery_minutes
+
+def _parse_segment(phase, text):
+    recovery = 0.0
+    match = _RECOVERY.search(text)
+    if match is not None:
+        recovery = _to_minutes(match.group(1), match.group(2))
+        text = text[:match.start()] + text[match.end():]
+
+    repeats, minutes, percent = 1, None, None
+    match = _PERCENT.search(text)
+    if match is not None:
+        # Distance-based; durations in the text describe the alternation, not the total
+        percent = int(match.group(1))
+    else:
+        match = _DURATION.search(text)
+        if match is not None:
+            repeats = int(match.group(1) or 1)
+            minutes = _to_minutes(match.group(2), match.group(4))
+            if match.group(3):  # "5 to 10 minutes": take the middle of the range
+                minutes = (minutes + _to_minutes(match.group(3), match.group(4))) / 2
+
+    intensity = None
+    for tag, pattern in _INTENSITY:
+        if pattern.search(text):
+            intensity = tag
+            break
+    sport = _SPORT.search(text)
+    return Segment(phase, _SPORT_OF_WORD[sport.group(1).lower()] if sport else None,
+                   repeats, minutes, recovery, intensity, percent)
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_details(details):
+    # Segments for a details string, as a tuple. The same few hundred texts
+    # repeat across weeks and plans, so results are cached by string.
+    text = " ".join(details.split())
+    pieces = []
+    matches = list(_PHASE.finditer(text))
+    if not matches:
+        pieces.append(("MS", text))
+    else:
+        if matches[0].start() > 0:
+            pieces.append(("MS", text[:matches[0].start()]))
+        for idx, match in enumerate(matches):
+            end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+            pieces.append((match.group(1), text[match.end():end]))
+
+    segments = []
+    for phase, piece in pieces:
+        for part in _THEN.split(piece):
+            if part.strip(" ."):
+                segments.append(_parse_segment(phase, part))
+    return tuple(segments)
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_workout(title, details):
+    match = _TITLE_MINUTES.match(title)
+    return Workout(int(match.group(1)) if match else None, parse_details(details))
+
+def _default_sport(activity_type, title):
+    if activity_type in SPORTS:
+        return activity_type
+    match = _SPORT.search(title)
+    return _SPORT_OF_WORD[match.group(1).lower()] if match else None
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def workout_minutes(activity_type, title, details):
+    # ((sport, intensity), minutes) pairs for one workout. Segments without a
+    # sport take the workout's, or OTHER when neither the activity type nor
+    # the title names one; recovery intervals count as easy. Whatever the
+    # title's duration ("25-Minute Peak Swim") leaves after the timed segments
+    # is split over the untimed ones ("Swim 75% of goal race distance"), or
+    # over the whole workout when the details give no durations at all.
+    if activity_type == "Rest":
+        return ()
+    workout = parse_workout(title, details)
+    default_sport = _default_sport(activity_type, title) or OTHER
+    totals = Counter()
+    untimed = []
+    for segment in workout.segments:
+        sport = segment.sport or default_sport
+        if segment.minutes is None:
+            untimed.append((sport, segment.intensity))
+            continue
+        totals[sport, segment.intensity or UNSPECIFIED] += segment.repeats * segment.minutes
+        if segment.repeats > 1 and segment.recovery_minutes:
+            totals[sport, "easy"] += (segment.repeats - 1) * segment.recovery_minutes
+
+    remaining = (workout.title_minutes or 0) - sum(totals.values())
+    if remaining > 0:
+        if not totals:
+            # No durations at all: one block, tagged with the first intensity
+            # the details or the title mention
+            intensity = next((i for _, i in untimed if i), None) or next(
+                (tag for tag, pattern in _INTENSITY if pattern.search(title)), None)
+            untimed = [(default_sport, intensity)]
+        for sport, intensity in untimed:
+            totals[sport, intensity or UNSPECIFIED] += remaining / len(untimed)
+    return tuple(totals.items())
+
+def aggregate_volume(plans, by_plan=False):
+    # Minutes per week, split by sport and by intensity, over many plans.
+    # `plans` is a PlanTable or a list of plans (lists of entries). Weeks are
+    # summed across plans unless by_plan is set, in which case keys are
+    # (plan, week).
+    #
+    # Rows are first counted per distinct (week, type, title, details) with a
+    # C-level Counter over the table's columns, so the Python work grows with
+    # the number of distinct workouts rather than with the number of rows.
+    table = plans if isinstance(plans, PlanTable) else PlanTable.from_plans(plans)
+    columns = [table.week, table.type_code, table.title, table.details]
+    if by_plan:
+        columns.insert(0, table.plan)
+    groups = Counter(zip(*columns))
+
+    strings = table.strings
+    activity_types = table.activity_types
+    result = {}
+    for key, count in groups.items():
+        *where, type_code, title, details = key
+        profile = workout_minutes(activity_types[type_code], strings[title], strings[details])
+        if not profile:
+            continue
+        week_key = tuple(where) if by_plan else where[0]
+        week = result.get(week_key)
+        if week is None:
+            week = result[week_key] = {"minutes": 0.0, "sports": {}, "intensity": {}}
+        for (sport, intensity), minutes in profile:
+            minutes *= count
+            week["minutes"] += minutes
+            week["sports"][sport] = week["sports"].get(sport, 0.0) + minutes
+            week["intensity"][intensity] = week["intensity"].get(intensity, 0.0) + minutes
+    return dict(sorted(result.items()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Weekly training volume by sport and intensity.")
+    parser.add_argument("plans", nargs="*", default=["training_plan.json"], help="Plan JSON files")
+    parser.add_argument("--json", action="store_true", help="Print the aggregates as JSON")
+    parser.add_argument("--details", metavar="TEXT", help="Parse one details string and print its segments")
+    args = parser.parse_args(argv)
+
+    if args.details is not None:
+        for segment in parse_details(args.details.replace("\\n", "\n")):
+            print(json.dumps(segment._asdict()))
+        return 0
+
+    plans = []
+    for path in args.plans:
+        with open(path, "r") as f:
+            plans.append(json.load(f))
+    volume = aggregate_volume(plans)
+    if args.json:
+        print(json.dumps({str(week): totals for week, totals in volume.items()}, indent=4))
+        return 0
+    for week, totals in volume.items():
+        sports = ", ".join(f"{sport} {minutes:.0f}" for sport, minutes in sorted(totals["sports"].items()))
+        intensity = ", ".join(f"{tag} {minutes / totals['minutes']:.0%}"
+                              for tag, minutes in sorted(totals["intensity"].items(), key=lambda item: -item[1]))
+        print(f"Week {week:>2}: {totals['minutes']:>6.0f} min  ({sports})  [{intensity}]")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())